@@ -0,0 +1,45 @@
+"""Add devices for DynDNS2 push updates
+
+Revision ID: a83f5d2c6e14
+Revises: f1d6c0a4b893
+Create Date: 2026-10-17 15:52:33.408176
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a83f5d2c6e14'
+down_revision = 'f1d6c0a4b893'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('devices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('last_ip', sa.String(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_devices_id'), 'devices', ['id'], unique=False)
+    op.create_index(op.f('ix_devices_username'), 'devices', ['username'], unique=True)
+    op.add_column('domains', sa.Column('device_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('domains_device_id_fkey', 'domains', 'devices', ['device_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    op.drop_constraint('domains_device_id_fkey', 'domains', type_='foreignkey')
+    op.drop_column('domains', 'device_id')
+    op.drop_index(op.f('ix_devices_username'), table_name='devices')
+    op.drop_index(op.f('ix_devices_id'), table_name='devices')
+    op.drop_table('devices')
@@ -0,0 +1,38 @@
+"""add ip_detection.source_timeouts setting
+
+Revision ID: b7e2c91d4a60
+Revises: 60ce81df8091
+Create Date: 2026-10-17 09:12:41.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c91d4a60'
+down_revision = '60ce81df8091'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    settings_table = sa.table('settings',
+        sa.column('key', sa.String),
+        sa.column('value', sa.JSON),
+        sa.column('description', sa.String),
+        sa.column('is_system', sa.Boolean)
+    )
+    
+    op.bulk_insert(settings_table, [
+        {
+            'key': 'ip_detection.source_timeouts',
+            'value': {},
+            'description': 'Per-source IP detection timeout overrides in seconds',
+            'is_system': True
+        }
+    ])
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM settings WHERE key = 'ip_detection.source_timeouts'")
@@ -0,0 +1,46 @@
+"""Add notification outbox
+
+Revision ID: c2b9e7d41f30
+Revises: a83f5d2c6e14
+Create Date: 2026-10-17 17:05:48.221934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b9e7d41f30'
+down_revision = 'a83f5d2c6e14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('slack_account_id', sa.Integer(), nullable=False),
+    sa.Column('domain_id', sa.Integer(), nullable=True),
+    sa.Column('domain_name', sa.String(), nullable=False),
+    sa.Column('record_type', sa.String(), nullable=False),
+    sa.Column('ttl', sa.Integer(), nullable=True),
+    sa.Column('old_ip', sa.String(), nullable=True),
+    sa.Column('new_ip', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['slack_account_id'], ['slack_accounts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['domain_id'], ['domains.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notification_outbox_id'), 'notification_outbox', ['id'], unique=False)
+    op.create_index('ix_notification_outbox_status_next_attempt', 'notification_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_outbox_status_next_attempt', table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_id'), table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,26 @@
+"""add domain leases for sharded schedulers
+
+Revision ID: d41f8a7c2e95
+Revises: b7e2c91d4a60
+Create Date: 2026-10-17 11:02:18.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f8a7c2e95'
+down_revision = 'b7e2c91d4a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('domains', sa.Column('lease_owner', sa.String(), nullable=True))
+    op.add_column('domains', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('domains', 'lease_expires_at')
+    op.drop_column('domains', 'lease_owner')
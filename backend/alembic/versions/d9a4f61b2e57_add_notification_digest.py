@@ -0,0 +1,49 @@
+"""Add notification digest settings and outbox batch id
+
+Revision ID: d9a4f61b2e57
+Revises: c2b9e7d41f30
+Create Date: 2026-10-17 18:21:15.640392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a4f61b2e57'
+down_revision = 'c2b9e7d41f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_outbox', sa.Column('batch_id', sa.String(), nullable=True))
+    op.create_index(op.f('ix_notification_outbox_batch_id'), 'notification_outbox', ['batch_id'], unique=False)
+    
+    settings_table = sa.table('settings',
+        sa.column('key', sa.String),
+        sa.column('value', sa.JSON),
+        sa.column('description', sa.String),
+        sa.column('is_system', sa.Boolean)
+    )
+    
+    op.bulk_insert(settings_table, [
+        {
+            'key': 'notifications.digest_enabled',
+            'value': True,
+            'description': 'Send one Slack digest per webhook and update cycle instead of one message per domain',
+            'is_system': True
+        },
+        {
+            'key': 'notifications.digest_max_items',
+            'value': 20,
+            'description': 'Maximum number of domains listed in a digest before it is summarised',
+            'is_system': True
+        }
+    ])
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM settings WHERE key IN ('notifications.digest_enabled', 'notifications.digest_max_items')")
+    op.drop_index(op.f('ix_notification_outbox_batch_id'), table_name='notification_outbox')
+    op.drop_column('notification_outbox', 'batch_id')
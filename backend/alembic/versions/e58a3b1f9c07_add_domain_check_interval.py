@@ -0,0 +1,24 @@
+"""add per-domain check interval
+
+Revision ID: e58a3b1f9c07
+Revises: d41f8a7c2e95
+Create Date: 2026-10-17 13:24:51.317208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58a3b1f9c07'
+down_revision = 'd41f8a7c2e95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('domains', sa.Column('check_interval', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('domains', 'check_interval')
@@ -0,0 +1,61 @@
+"""add adaptive polling interval settings
+
+Revision ID: f1d6c0a4b893
+Revises: e58a3b1f9c07
+Create Date: 2026-10-17 14:40:07.582119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d6c0a4b893'
+down_revision = 'e58a3b1f9c07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    settings_table = sa.table('settings',
+        sa.column('key', sa.String),
+        sa.column('value', sa.JSON),
+        sa.column('description', sa.String),
+        sa.column('is_system', sa.Boolean)
+    )
+    
+    op.bulk_insert(settings_table, [
+        {
+            'key': 'scheduler.adaptive_enabled',
+            'value': False,
+            'description': 'Adapt the check interval to IP stability instead of using the fixed refresh interval',
+            'is_system': True
+        },
+        {
+            'key': 'scheduler.min_interval',
+            'value': 30,
+            'description': 'Adaptive check interval right after an IP change or detection failure, in seconds',
+            'is_system': True
+        },
+        {
+            'key': 'scheduler.max_interval',
+            'value': 1800,
+            'description': 'Longest adaptive check interval while the IP is stable, in seconds',
+            'is_system': True
+        },
+        {
+            'key': 'scheduler.backoff_factor',
+            'value': 2.0,
+            'description': 'Multiplier applied to the adaptive interval after each stable period',
+            'is_system': True
+        }
+    ])
+
+
+def downgrade() -> None:
+    op.execute(
+        "DELETE FROM settings WHERE key IN ("
+        "'scheduler.adaptive_enabled', 'scheduler.min_interval', "
+        "'scheduler.max_interval', 'scheduler.backoff_factor', "
+        "'scheduler.effective_interval')"
+    )
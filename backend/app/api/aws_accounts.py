@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models import User, AWSAccount
-from app.services.route53 import Route53Service
+from app.services.route53 import Route53Service, route53_clients, route53_rate_limiter
 
 router = APIRouter()
 
@@ -28,7 +29,7 @@ class AWSAccountResponse(BaseModel):
 async def create_aws_account(
     account: AWSAccountCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         test_account = AWSAccount(
@@ -55,8 +56,8 @@ async def create_aws_account(
             user_id=current_user.id
         )
         db.add(db_account)
-        db.commit()
-        db.refresh(db_account)
+        await db.commit()
+        await db.refresh(db_account)
         
         return db_account
     except Exception as e:
@@ -68,21 +69,21 @@ async def create_aws_account(
 @router.get("/", response_model=List[AWSAccountResponse])
 async def list_aws_accounts(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    accounts = db.query(AWSAccount).filter(AWSAccount.user_id == current_user.id).all()
+    accounts = (await db.scalars(select(AWSAccount).where(AWSAccount.user_id == current_user.id))).all()
     return accounts
 
 @router.delete("/{account_id}")
 async def delete_aws_account(
     account_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    account = db.query(AWSAccount).filter(
+    account = await db.scalar(select(AWSAccount).where(
         AWSAccount.id == account_id,
         AWSAccount.user_id == current_user.id
-    ).first()
+    ))
     
     if not account:
         raise HTTPException(
@@ -90,6 +91,8 @@ async def delete_aws_account(
             detail="AWS account not found"
         )
     
-    db.delete(account)
-    db.commit()
+    await db.delete(account)
+    await db.commit()
+    route53_clients.evict(account_id)
+    route53_rate_limiter.discard(account_id)
     return {"message": "AWS account deleted successfully"}
\ No newline at end of file
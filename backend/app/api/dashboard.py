@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 from app.core.database import get_db
 from app.core.security import get_current_user
-from app.models import User, Domain, AWSAccount
+from app.models import User, Domain, AWSAccount, Settings
 from app.services.ip_detection import ip_service
 
 router = APIRouter()
@@ -15,26 +16,45 @@ class DashboardStats(BaseModel):
     total_aws_accounts: int
     current_ipv4: Optional[str] = None
     current_ipv6: Optional[str] = None
+    effective_interval: Optional[int] = None
+    adaptive_polling: bool = False
 
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    total_domains = db.query(Domain).filter(Domain.user_id == current_user.id).count()
-    active_domains = db.query(Domain).filter(
+    total_domains = await db.scalar(
+        select(func.count(Domain.id)).where(Domain.user_id == current_user.id)
+    )
+    active_domains = await db.scalar(select(func.count(Domain.id)).where(
         Domain.user_id == current_user.id,
         Domain.is_active == True
-    ).count()
-    total_aws_accounts = db.query(AWSAccount).filter(AWSAccount.user_id == current_user.id).count()
+    ))
+    total_aws_accounts = await db.scalar(
+        select(func.count(AWSAccount.id)).where(AWSAccount.user_id == current_user.id)
+    )
     
-    current_ipv4 = await ip_service.get_public_ipv4()
-    current_ipv6 = await ip_service.get_public_ipv6()
+    # Dernière IP connue sans attendre de sonde ; une fois expirée, elle est rafraîchie en arrière-plan
+    current_ipv4 = await ip_service.get_public_ipv4(allow_stale=True)
+    current_ipv6 = await ip_service.get_public_ipv6(allow_stale=True)
+    
+    # Intervalle publié par le scheduler leader, qui peut tourner dans un autre processus
+    scheduler_settings = {
+        setting.key: setting.value
+        for setting in (await db.scalars(select(Settings).where(Settings.key.in_([
+            "scheduler.refresh_interval", "scheduler.adaptive_enabled", "scheduler.effective_interval"
+        ])))).all()
+    }
+    adaptive_polling = scheduler_settings.get("scheduler.adaptive_enabled") is True
+    effective_interval = scheduler_settings.get("scheduler.effective_interval") if adaptive_polling else None
     
     return DashboardStats(
         total_domains=total_domains,
         active_domains=active_domains,
         total_aws_accounts=total_aws_accounts,
         current_ipv4=current_ipv4,
-        current_ipv6=current_ipv6
+        current_ipv6=current_ipv6,
+        effective_interval=effective_interval or scheduler_settings.get("scheduler.refresh_interval", 300),
+        adaptive_polling=adaptive_polling
     )
\ No newline at end of file
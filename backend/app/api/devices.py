@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from app.core.database import get_db
+from app.core.security import get_current_user, get_password_hash
+from app.models import User, Device, Domain
+from app.services.scheduler import scheduler
+from app.services.domain_events import notify_domain_change
+
+router = APIRouter()
+
+class DeviceCreate(BaseModel):
+    name: str
+    username: str = Field(..., min_length=3)
+    password: str = Field(..., min_length=8)
+
+class DeviceResponse(BaseModel):
+    id: int
+    name: str
+    username: str
+    is_active: bool
+    last_ip: Optional[str]
+    last_seen_at: Optional[datetime]
+    
+    class Config:
+        from_attributes = True
+
+class DeviceUpdate(BaseModel):
+    name: Optional[str] = None
+    password: Optional[str] = Field(None, min_length=8)
+    is_active: Optional[bool] = None
+
+@router.post("/", response_model=DeviceResponse)
+async def create_device(
+    device: DeviceCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Créer les identifiants DynDNS2 d'un équipement"""
+    if await db.scalar(select(Device).where(Device.username == device.username)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    
+    db_device = Device(
+        name=device.name,
+        username=device.username,
+        hashed_password=get_password_hash(device.password),
+        user_id=current_user.id
+    )
+    db.add(db_device)
+    await db.commit()
+    await db.refresh(db_device)
+    return db_device
+
+@router.get("/", response_model=List[DeviceResponse])
+async def list_devices(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Lister les équipements"""
+    return (await db.scalars(select(Device).where(Device.user_id == current_user.id))).all()
+
+@router.put("/{device_id}", response_model=DeviceResponse)
+async def update_device(
+    device_id: int,
+    device_data: DeviceUpdate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Mettre à jour un équipement"""
+    device = await db.scalar(select(Device).where(
+        Device.id == device_id,
+        Device.user_id == current_user.id
+    ))
+    
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device not found"
+        )
+    
+    if device_data.name is not None:
+        device.name = device_data.name
+    if device_data.password is not None:
+        device.hashed_password = get_password_hash(device_data.password)
+    if device_data.is_active is not None:
+        device.is_active = device_data.is_active
+    
+    await db.commit()
+    await db.refresh(device)
+    return device
+
+@router.delete("/{device_id}")
+async def delete_device(
+    device_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Supprimer un équipement : ses domaines reviennent à la détection par le scheduler"""
+    device = await db.scalar(select(Device).where(
+        Device.id == device_id,
+        Device.user_id == current_user.id
+    ))
+    
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device not found"
+        )
+    
+    await db.execute(
+        update(Domain)
+        .where(Domain.device_id == device.id)
+        .values(device_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.delete(device)
+    await notify_domain_change(db)
+    await db.commit()
+    scheduler.invalidate_domain_index()
+    return {"message": "Device deleted successfully"}
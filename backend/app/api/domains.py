@@ -1,14 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 from app.core.database import get_db
 from app.core.security import get_current_user
-from app.models import User, Domain, AWSAccount, SlackAccount, RecordType
+from app.models import User, Domain, AWSAccount, SlackAccount, RecordType, Device
 from app.services.route53 import Route53Service
 from app.services.ip_detection import ip_service
-from app.services.slack_notification import SlackNotificationService
+from app.services.notification_outbox import enqueue_ip_changes, notification_dispatcher
+from app.services.scheduler import scheduler
+from app.services.domain_events import notify_domain_change
 
 router = APIRouter()
 
@@ -19,6 +23,8 @@ class DomainCreate(BaseModel):
     ttl: int = 300
     aws_account_id: int
     slack_account_id: Optional[int] = None
+    check_interval: Optional[int] = Field(None, ge=1)
+    device_id: Optional[int] = None
 
 class DomainResponse(BaseModel):
     id: int
@@ -31,6 +37,8 @@ class DomainResponse(BaseModel):
     is_active: bool
     aws_account_id: int
     slack_account_id: Optional[int]
+    check_interval: Optional[int] = None
+    device_id: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -43,17 +51,33 @@ class DomainUpdate(BaseModel):
     aws_account_id: Optional[int] = None
     slack_account_id: Optional[int] = None
     is_active: Optional[bool] = None
+    # 0 revient à l'intervalle global
+    check_interval: Optional[int] = Field(None, ge=0)
+    # 0 rend le domaine à la détection par le scheduler
+    device_id: Optional[int] = None
+
+async def _get_device(device_id: int, current_user: User, db: AsyncSession) -> Device:
+    device = await db.scalar(select(Device).where(
+        Device.id == device_id,
+        Device.user_id == current_user.id
+    ))
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device not found"
+        )
+    return device
 
 @router.post("/", response_model=DomainResponse)
 async def create_domain(
     domain: DomainCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    aws_account = db.query(AWSAccount).filter(
+    aws_account = await db.scalar(select(AWSAccount).where(
         AWSAccount.id == domain.aws_account_id,
         AWSAccount.user_id == current_user.id
-    ).first()
+    ))
     
     if not aws_account:
         raise HTTPException(
@@ -63,11 +87,11 @@ async def create_domain(
     
     # Vérifier le compte Slack si fourni
     if domain.slack_account_id:
-        slack_account = db.query(SlackAccount).filter(
+        slack_account = await db.scalar(select(SlackAccount).where(
             SlackAccount.id == domain.slack_account_id,
             SlackAccount.user_id == current_user.id,
             SlackAccount.is_active == True
-        ).first()
+        ))
         
         if not slack_account:
             raise HTTPException(
@@ -75,6 +99,9 @@ async def create_domain(
                 detail="Compte Slack introuvable ou inactif"
             )
     
+    if domain.device_id:
+        await _get_device(domain.device_id, current_user, db)
+    
     db_domain = Domain(
         name=domain.name,
         zone_id=domain.zone_id,
@@ -82,20 +109,26 @@ async def create_domain(
         ttl=domain.ttl,
         aws_account_id=domain.aws_account_id,
         slack_account_id=domain.slack_account_id,
+        check_interval=domain.check_interval,
+        device_id=domain.device_id,
         user_id=current_user.id
     )
     db.add(db_domain)
-    db.commit()
-    db.refresh(db_domain)
+    await db.flush()
+    # Publié par le scheduler leader dès la validation de la transaction
+    await notify_domain_change(db, db_domain.id)
+    await db.commit()
+    await db.refresh(db_domain)
+    scheduler.invalidate_domain_index(db_domain.id)
     
     return db_domain
 
 @router.get("/", response_model=List[DomainResponse])
 async def list_domains(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    domains = db.query(Domain).filter(Domain.user_id == current_user.id).all()
+    domains = (await db.scalars(select(Domain).where(Domain.user_id == current_user.id))).all()
     return domains
 
 @router.put("/{domain_id}", response_model=DomainResponse)
@@ -103,13 +136,13 @@ async def update_domain(
     domain_id: int,
     domain_data: DomainUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mettre à jour un domaine"""
-    domain = db.query(Domain).filter(
+    domain = await db.scalar(select(Domain).where(
         Domain.id == domain_id,
         Domain.user_id == current_user.id
-    ).first()
+    ))
     
     if not domain:
         raise HTTPException(
@@ -119,10 +152,10 @@ async def update_domain(
     
     # Valider le compte AWS si changé
     if domain_data.aws_account_id and domain_data.aws_account_id != domain.aws_account_id:
-        aws_account = db.query(AWSAccount).filter(
+        aws_account = await db.scalar(select(AWSAccount).where(
             AWSAccount.id == domain_data.aws_account_id,
             AWSAccount.user_id == current_user.id
-        ).first()
+        ))
         
         if not aws_account:
             raise HTTPException(
@@ -132,11 +165,11 @@ async def update_domain(
     
     # Valider le compte Slack si changé
     if domain_data.slack_account_id and domain_data.slack_account_id != domain.slack_account_id:
-        slack_account = db.query(SlackAccount).filter(
+        slack_account = await db.scalar(select(SlackAccount).where(
             SlackAccount.id == domain_data.slack_account_id,
             SlackAccount.user_id == current_user.id,
             SlackAccount.is_active == True
-        ).first()
+        ))
         
         if not slack_account:
             raise HTTPException(
@@ -144,6 +177,9 @@ async def update_domain(
                 detail="Compte Slack introuvable ou inactif"
             )
     
+    if domain_data.device_id and domain_data.device_id != domain.device_id:
+        await _get_device(domain_data.device_id, current_user, db)
+    
     # Si le type d'enregistrement change, réinitialiser l'IP
     if domain_data.record_type and domain_data.record_type != domain.record_type:
         domain.current_ip = None
@@ -166,21 +202,28 @@ async def update_domain(
         domain.slack_account_id = None
     if domain_data.is_active is not None:
         domain.is_active = domain_data.is_active
+    if domain_data.check_interval is not None:
+        domain.check_interval = domain_data.check_interval or None
+    if domain_data.device_id is not None:
+        domain.device_id = domain_data.device_id or None
     
-    db.commit()
-    db.refresh(domain)
+    await notify_domain_change(db, domain.id)
+    await db.commit()
+    await db.refresh(domain)
+    scheduler.invalidate_domain_index(domain.id)
     return domain
 
 @router.put("/{domain_id}/update-ip")
 async def update_domain_ip(
     domain_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    domain = db.query(Domain).filter(
-        Domain.id == domain_id,
-        Domain.user_id == current_user.id
-    ).first()
+    domain = await db.scalar(
+        select(Domain)
+        .where(Domain.id == domain_id, Domain.user_id == current_user.id)
+        .options(selectinload(Domain.aws_account))
+    )
     
     if not domain:
         raise HTTPException(
@@ -188,10 +231,17 @@ async def update_domain_ip(
             detail="Domain not found"
         )
     
+    if domain.device_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This domain is updated by its device through /nic/update"
+        )
+    
+    # Mise à jour manuelle : forcer une nouvelle détection plutôt que le cache
     if domain.record_type == RecordType.A:
-        new_ip = await ip_service.get_public_ipv4()
+        new_ip = await ip_service.get_public_ipv4(force_refresh=True)
     else:
-        new_ip = await ip_service.get_public_ipv6()
+        new_ip = await ip_service.get_public_ipv6(force_refresh=True)
     
     if not new_ip:
         raise HTTPException(
@@ -208,17 +258,13 @@ async def update_domain_ip(
     success = await route53_service.update_record(domain, new_ip)
     
     if success:
+        await enqueue_ip_changes(db, [(domain, old_ip, new_ip)])
         domain.current_ip = new_ip
         domain.last_updated = datetime.utcnow()
-        db.commit()
-        
-        # Envoyer la notification Slack si configurée
-        if domain.slack_account and domain.slack_account.is_active:
-            try:
-                slack_service = SlackNotificationService(domain.slack_account)
-                await slack_service.send_ip_change_notification(domain, old_ip, new_ip)
-            except Exception as e:
-                print(f"Erreur notification Slack pour {domain.name}: {e}")
+        await notify_domain_change(db, domain.id)
+        await db.commit()
+        scheduler.invalidate_domain_index()
+        notification_dispatcher.wake()
         
         return {"message": "IP updated successfully", "new_ip": new_ip}
     else:
@@ -231,12 +277,12 @@ async def update_domain_ip(
 async def delete_domain(
     domain_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    domain = db.query(Domain).filter(
+    domain = await db.scalar(select(Domain).where(
         Domain.id == domain_id,
         Domain.user_id == current_user.id
-    ).first()
+    ))
     
     if not domain:
         raise HTTPException(
@@ -244,6 +290,8 @@ async def delete_domain(
             detail="Domain not found"
         )
     
-    db.delete(domain)
-    db.commit()
+    await db.delete(domain)
+    await notify_domain_change(db)
+    await db.commit()
+    scheduler.invalidate_domain_index()
     return {"message": "Domain deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,121 @@
+import asyncio
+import ipaddress
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from app.core.database import get_db
+from app.core.security import pwd_context
+from app.models import Device, Domain, RecordType
+from app.services.route53 import Route53Service
+from app.services.scheduler import scheduler
+
+router = APIRouter()
+basic_auth = HTTPBasic(auto_error=False)
+
+# Limite du protocole DynDNS2 pour le paramètre hostname
+MAX_HOSTNAMES = 20
+
+async def _authenticate(credentials: Optional[HTTPBasicCredentials], db: AsyncSession) -> Optional[Device]:
+    if credentials is None:
+        return None
+    device = await db.scalar(select(Device).where(Device.username == credentials.username))
+    if device is None:
+        # Même coût qu'un vrai mot de passe : ne pas révéler les identifiants existants
+        await asyncio.to_thread(pwd_context.dummy_verify)
+        return None
+    # bcrypt est lent : hors de la boucle d'événements pour ne pas bloquer les autres requêtes
+    if not await asyncio.to_thread(pwd_context.verify, credentials.password, device.hashed_password) or not device.is_active:
+        return None
+    return device
+
+def _parse_ips(myip: Optional[str], request: Request) -> Dict[RecordType, str]:
+    """myip may hold an IPv4, an IPv6 or both (comma separated); default to the caller address"""
+    candidates = myip.split(',') if myip else [request.client.host if request.client else '']
+    ips: Dict[RecordType, str] = {}
+    for candidate in candidates:
+        try:
+            address = ipaddress.ip_address(candidate.strip())
+        except ValueError:
+            continue
+        record_type = RecordType.A if address.version == 4 else RecordType.AAAA
+        ips.setdefault(record_type, str(address))
+    return ips
+
+def _is_fqdn(hostname: str) -> bool:
+    labels = hostname.rstrip('.').split('.')
+    return len(labels) > 1 and all(0 < len(label) <= 63 for label in labels)
+
+@router.get("/nic/update", response_class=PlainTextResponse)
+async def nic_update(
+    request: Request,
+    hostname: str = "",
+    myip: Optional[str] = None,
+    credentials: Optional[HTTPBasicCredentials] = Depends(basic_auth),
+    db: AsyncSession = Depends(get_db)
+):
+    """DynDNS2-compatible push update: one status line per hostname (good, nochg, nohost, notfqdn, 911)"""
+    device = await _authenticate(credentials, db)
+    if device is None:
+        return PlainTextResponse(
+            "badauth",
+            status_code=401,
+            headers={"WWW-Authenticate": 'Basic realm="dynamicroute"'}
+        )
+    
+    hostnames = [name.strip() for name in hostname.split(',') if name.strip()]
+    if not hostnames:
+        return PlainTextResponse("notfqdn")
+    if len(hostnames) > MAX_HOSTNAMES:
+        return PlainTextResponse("numhost")
+    
+    ips = _parse_ips(myip, request)
+    if not ips:
+        return PlainTextResponse("911")
+    
+    # Un équipement ne peut mettre à jour que les domaines qui lui sont attribués
+    device_domains: Dict[str, List[Domain]] = {}
+    for domain in (await db.scalars(
+        select(Domain)
+        .where(Domain.device_id == device.id, Domain.is_active == True)
+        .options(selectinload(Domain.aws_account))
+    )).all():
+        device_domains.setdefault(Route53Service.normalize_name(domain.name), []).append(domain)
+    
+    pending: List[Tuple[Domain, str]] = []
+    for name in hostnames:
+        for domain in device_domains.get(Route53Service.normalize_name(name), []):
+            new_ip = ips.get(domain.record_type)
+            if new_ip and domain.current_ip != new_ip:
+                pending.append((domain, new_ip))
+    
+    # Publication immédiate, par lots de zone, comme un cycle du scheduler
+    results = await scheduler.publish_updates(pending, db) if pending else {}
+    
+    lines = []
+    for name in hostnames:
+        if not _is_fqdn(name):
+            lines.append("notfqdn")
+            continue
+        domains = device_domains.get(Route53Service.normalize_name(name))
+        if not domains:
+            lines.append("nohost")
+            continue
+        applied = [ips[domain.record_type] for domain in domains if domain.record_type in ips]
+        shown = ','.join(dict.fromkeys(applied or ips.values()))
+        if any(results.get(domain.id) is False for domain in domains):
+            lines.append("911")
+        elif any(results.get(domain.id) for domain in domains):
+            lines.append(f"good {shown}")
+        else:
+            lines.append(f"nochg {shown}")
+    
+    device.last_ip = ','.join(ips.values())
+    device.last_seen_at = datetime.utcnow()
+    await db.commit()
+    
+    return PlainTextResponse('\n'.join(lines))
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
 from typing import List
 from pydantic import BaseModel
 
@@ -24,13 +26,17 @@ class HostedZoneRefreshRequest(BaseModel):
 
 @router.get("/", response_model=List[HostedZoneResponse])
 async def list_hosted_zones(
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_db), 
     current_user: User = Depends(get_current_user)
 ):
     """Get all hosted zones for the current user"""
-    hosted_zones = db.query(HostedZone).join(AWSAccount).filter(
-        AWSAccount.user_id == current_user.id
-    ).all()
+    # Le compte AWS vient de la jointure : pas de chargement paresseux en asynchrone
+    hosted_zones = (await db.scalars(
+        select(HostedZone)
+        .join(HostedZone.aws_account)
+        .where(AWSAccount.user_id == current_user.id)
+        .options(contains_eager(HostedZone.aws_account))
+    )).all()
     
     return [
         HostedZoneResponse(
@@ -48,16 +54,16 @@ async def list_hosted_zones(
 @router.post("/refresh")
 async def refresh_hosted_zones(
     request: HostedZoneRefreshRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Refresh hosted zones from AWS for a specific AWS account"""
     
     # Verify AWS account belongs to user
-    aws_account = db.query(AWSAccount).filter(
+    aws_account = await db.scalar(select(AWSAccount).where(
         AWSAccount.id == request.aws_account_id,
         AWSAccount.user_id == current_user.id
-    ).first()
+    ))
     
     if not aws_account:
         raise HTTPException(
@@ -70,13 +76,17 @@ async def refresh_hosted_zones(
         route53_service = Route53Service(aws_account)
         aws_zones = await route53_service.list_hosted_zones()
         
+        # Existing zones of the account, loaded in one query
+        existing_zones = {
+            zone.aws_zone_id: zone
+            for zone in (await db.scalars(
+                select(HostedZone).where(HostedZone.aws_account_id == aws_account.id)
+            )).all()
+        }
+        
         # Update or create hosted zones in database
         for aws_zone in aws_zones:
-            # Check if hosted zone already exists
-            existing_zone = db.query(HostedZone).filter(
-                HostedZone.aws_zone_id == aws_zone['id'],
-                HostedZone.aws_account_id == aws_account.id
-            ).first()
+            existing_zone = existing_zones.get(aws_zone['id'])
             
             if existing_zone:
                 # Update existing zone
@@ -96,7 +106,7 @@ async def refresh_hosted_zones(
                 )
                 db.add(new_zone)
         
-        db.commit()
+        await db.commit()
         
         return {"message": f"Refreshed {len(aws_zones)} hosted zones"}
         
@@ -1,19 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Dict, Any, Union
-from app.core.database import get_db
+from app.core.database import get_db, pool_stats
 from app.core.security import get_current_user
 from app.models import User, Settings
+from app.services.ip_detection import ip_service
+from app.services.route53 import route53_clients, route53_rate_limiter
 
 router = APIRouter()
 
 class SettingUpdate(BaseModel):
-    value: Union[List[str], int, str, Dict[str, Any]]
+    value: Union[bool, int, float, List[str], str, Dict[str, Any]]
 
 class SettingResponse(BaseModel):
     key: str
-    value: Union[List[str], int, str, Dict[str, Any]]
+    value: Union[bool, int, float, List[str], str, Dict[str, Any]]
     description: str
     is_system: bool
     
@@ -23,10 +26,10 @@ class SettingResponse(BaseModel):
 @router.get("/", response_model=Dict[str, Any])
 async def get_all_settings(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all settings as a flat dictionary"""
-    settings = db.query(Settings).all()
+    settings = (await db.scalars(select(Settings))).all()
     
     result = {}
     for setting in settings:
@@ -38,14 +41,31 @@ async def get_all_settings(
     
     return result
 
+@router.get("/diagnostics", response_model=Dict[str, Any])
+async def get_diagnostics(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get runtime health of the database pool, IP detection sources, Route53 clients, the scheduler queue and the notification outbox"""
+    from app.services.scheduler import scheduler
+    from app.services.notification_outbox import notification_dispatcher
+    return {
+        "database_pool": pool_stats(),
+        "scheduler_queue": scheduler.queue_stats(),
+        "notification_outbox": await notification_dispatcher.stats(db),
+        "ip_sources": ip_service.get_source_stats(),
+        "route53_clients": route53_clients.stats(),
+        "route53_rate_limits": route53_rate_limiter.stats()
+    }
+
 @router.get("/{setting_key}", response_model=SettingResponse)
 async def get_setting(
     setting_key: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific setting by key"""
-    setting = db.query(Settings).filter(Settings.key == setting_key).first()
+    setting = await db.scalar(select(Settings).where(Settings.key == setting_key))
     
     if not setting:
         raise HTTPException(
@@ -60,10 +80,10 @@ async def update_setting(
     setting_key: str,
     setting_data: SettingUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a setting value"""
-    setting = db.query(Settings).filter(Settings.key == setting_key).first()
+    setting = await db.scalar(select(Settings).where(Settings.key == setting_key))
     
     if not setting:
         raise HTTPException(
@@ -73,12 +93,53 @@ async def update_setting(
     
     # Validate setting-specific constraints
     if setting_key == "scheduler.refresh_interval":
-        if not isinstance(setting_data.value, int) or setting_data.value < 1:
+        if isinstance(setting_data.value, bool) or not isinstance(setting_data.value, int) or setting_data.value < 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Refresh interval must be a positive integer (seconds)"
             )
     
+    elif setting_key in ["scheduler.min_interval", "scheduler.max_interval"]:
+        if isinstance(setting_data.value, bool) or not isinstance(setting_data.value, int) or setting_data.value < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Adaptive interval bounds must be positive integers (seconds)"
+            )
+    
+    elif setting_key == "scheduler.backoff_factor":
+        if isinstance(setting_data.value, bool) or not isinstance(setting_data.value, (int, float)) or setting_data.value < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Backoff factor must be a number greater than or equal to 1"
+            )
+    
+    elif setting_key == "scheduler.adaptive_enabled":
+        if not isinstance(setting_data.value, bool):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Adaptive polling must be enabled or disabled with a boolean"
+            )
+    
+    elif setting_key == "notifications.digest_enabled":
+        if not isinstance(setting_data.value, bool):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Digest mode must be enabled or disabled with a boolean"
+            )
+    
+    elif setting_key == "notifications.digest_max_items":
+        if isinstance(setting_data.value, bool) or not isinstance(setting_data.value, int) or setting_data.value < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Digest max items must be a positive integer"
+            )
+    
+    elif setting_key == "scheduler.effective_interval":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The effective interval is managed by the scheduler"
+        )
+    
     elif setting_key in ["ip_detection.ipv4_sources", "ip_detection.ipv6_sources"]:
         if not isinstance(setting_data.value, list) or len(setting_data.value) == 0:
             raise HTTPException(
@@ -86,23 +147,37 @@ async def update_setting(
                 detail="IP sources must be a non-empty list of URLs"
             )
         
-        # Validate URLs
+        # Validate URLs (HTTP echo services, dns://<resolver>/<name> queries or iface://[name])
         for url in setting_data.value:
-            if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            if not isinstance(url, str) or not url.startswith(('http://', 'https://', 'dns://', 'iface://')):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Invalid URL: {url}"
                 )
     
+    elif setting_key == "ip_detection.source_timeouts":
+        if not isinstance(setting_data.value, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Source timeouts must be an object mapping URLs to seconds"
+            )
+        
+        for url, timeout in setting_data.value.items():
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid timeout for {url}: must be a positive number of seconds"
+                )
+    
     setting.value = setting_data.value
-    db.commit()
-    db.refresh(setting)
+    await db.commit()
+    await db.refresh(setting)
     
-    # Restart scheduler if refresh interval was changed
-    if setting_key == "scheduler.refresh_interval":
+    # Restart scheduler if refresh interval or adaptive polling was changed
+    if setting_key.startswith("scheduler."):
         try:
             from app.services.scheduler import scheduler
-            scheduler.restart_with_new_interval()
+            await scheduler.restart_with_new_interval()
         except Exception as e:
             print(f"Warning: Could not restart scheduler: {e}")
     
@@ -112,10 +187,10 @@ async def update_setting(
 async def reset_setting_to_default(
     setting_key: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Reset a setting to its default value"""
-    setting = db.query(Settings).filter(Settings.key == setting_key).first()
+    setting = await db.scalar(select(Settings).where(Settings.key == setting_key))
     
     if not setting:
         raise HTTPException(
@@ -134,14 +209,14 @@ async def reset_setting_to_default(
         )
     
     setting.value = default_setting["value"]
-    db.commit()
-    db.refresh(setting)
+    await db.commit()
+    await db.refresh(setting)
     
-    # Restart scheduler if refresh interval was reset
-    if setting_key == "scheduler.refresh_interval":
+    # Restart scheduler if refresh interval or adaptive polling was reset
+    if setting_key.startswith("scheduler."):
         try:
             from app.services.scheduler import scheduler
-            scheduler.restart_with_new_interval()
+            await scheduler.restart_with_new_interval()
         except Exception as e:
             print(f"Warning: Could not restart scheduler: {e}")
     
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, HttpUrl
 from typing import List
 from app.core.database import get_db
@@ -31,7 +32,7 @@ class SlackAccountUpdate(BaseModel):
 async def create_slack_account(
     account: SlackAccountCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Créer un compte Slack"""
     # Créer le compte temporaire pour tester
@@ -58,18 +59,18 @@ async def create_slack_account(
         user_id=current_user.id
     )
     db.add(db_account)
-    db.commit()
-    db.refresh(db_account)
+    await db.commit()
+    await db.refresh(db_account)
     
     return db_account
 
 @router.get("/", response_model=List[SlackAccountResponse])
 async def list_slack_accounts(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Lister les comptes Slack"""
-    accounts = db.query(SlackAccount).filter(SlackAccount.user_id == current_user.id).all()
+    accounts = (await db.scalars(select(SlackAccount).where(SlackAccount.user_id == current_user.id))).all()
     return accounts
 
 @router.put("/{account_id}", response_model=SlackAccountResponse)
@@ -77,13 +78,13 @@ async def update_slack_account(
     account_id: int,
     account_data: SlackAccountUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mettre à jour un compte Slack"""
-    account = db.query(SlackAccount).filter(
+    account = await db.scalar(select(SlackAccount).where(
         SlackAccount.id == account_id,
         SlackAccount.user_id == current_user.id
-    ).first()
+    ))
     
     if not account:
         raise HTTPException(
@@ -115,21 +116,21 @@ async def update_slack_account(
     if account_data.is_active is not None:
         account.is_active = account_data.is_active
     
-    db.commit()
-    db.refresh(account)
+    await db.commit()
+    await db.refresh(account)
     return account
 
 @router.post("/{account_id}/test")
 async def test_slack_webhook(
     account_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Tester un webhook Slack"""
-    account = db.query(SlackAccount).filter(
+    account = await db.scalar(select(SlackAccount).where(
         SlackAccount.id == account_id,
         SlackAccount.user_id == current_user.id
-    ).first()
+    ))
     
     if not account:
         raise HTTPException(
@@ -152,13 +153,13 @@ async def test_slack_webhook(
 async def delete_slack_account(
     account_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Supprimer un compte Slack"""
-    account = db.query(SlackAccount).filter(
+    account = await db.scalar(select(SlackAccount).where(
         SlackAccount.id == account_id,
         SlackAccount.user_id == current_user.id
-    ).first()
+    ))
     
     if not account:
         raise HTTPException(
@@ -166,6 +167,6 @@ async def delete_slack_account(
             detail="Compte Slack introuvable"
         )
     
-    db.delete(account)
-    db.commit()
+    await db.delete(account)
+    await db.commit()
     return {"message": "Compte Slack supprimé avec succès"}
\ No newline at end of file
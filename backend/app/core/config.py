@@ -4,6 +4,15 @@ import json
 
 class Settings(BaseSettings):
     database_url: str = "postgresql://user:password@db:5432/dynamicroute53"
+    # URL du moteur asynchrone (API, scheduler) ; déduite de DATABASE_URL si vide (asyncpg)
+    async_database_url: Optional[str] = None
+    # Pool de connexions du moteur asynchrone
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    # En-tête X-Query-Count sur chaque réponse de l'API (détection des N+1 en développement)
+    sql_query_count_header: bool = False
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
@@ -20,6 +29,76 @@ class Settings(BaseSettings):
     ]
     
     update_interval_minutes: int = 5
+    
+    # Scheduler intégré à l'API (désactiver si `python -m app.worker` tourne à part)
+    scheduler_enabled: bool = True
+    # Un seul processus exécute le scheduler (verrou consultatif PostgreSQL)
+    leader_election_enabled: bool = True
+    leader_lock_key: int = 53053
+    leader_heartbeat_seconds: int = 10
+    # Répartition des domaines entre plusieurs réplicas via des baux en base
+    scheduler_sharding_enabled: bool = False
+    scheduler_lease_batch_size: int = 200
+    scheduler_lease_seconds: int = 120
+    # File de domaines par échéance : période de réveil et gigue appliquée à chaque intervalle
+    scheduler_tick_seconds: float = 1.0
+    scheduler_jitter_ratio: float = 0.1
+    # Budget de temps d'un cycle (0 : l'intervalle effectif), le reste est repris au cycle suivant
+    scheduler_cycle_budget_seconds: float = 0
+    # Retard toléré pour une exécution manquée avant qu'elle soit abandonnée
+    scheduler_misfire_grace_seconds: int = 30
+    
+    # Parallélisme des mises à jour DNS pendant un cycle du scheduler
+    scheduler_max_concurrency: int = 50
+    scheduler_max_concurrency_per_account: int = 10
+    
+    # Réconciliation Route53 / base de données (0 pour désactiver)
+    reconcile_interval_seconds: int = 3600
+    # Budget de temps d'une réconciliation (0 : l'intervalle de réconciliation), les zones restantes passent en tête à la suivante
+    reconcile_budget_seconds: float = 0
+    
+    # Exécution des appels boto3 : "threadpool" (hors boucle asyncio) ou "inline" (bloquant)
+    route53_backend: str = "threadpool"
+    route53_max_workers: int = 20
+    route53_connect_timeout: float = 5.0
+    route53_read_timeout: float = 30.0
+    
+    # Limite de débit Route53 par compte AWS et nouvelles tentatives sur Throttling
+    route53_rate_limit: float = 5.0
+    route53_rate_burst: int = 5
+    route53_max_retries: int = 5
+    route53_backoff_base: float = 0.2
+    route53_backoff_max: float = 10.0
+    
+    # Durée de validité de l'IP publique détectée, partagée par tout le processus
+    ip_cache_ttl_seconds: int = 60
+    
+    # Sondage des sources d'IP : "race" (requêtes décalées en parallèle) ou "sequential"
+    ip_detection_strategy: str = "race"
+    ip_detection_race_width: int = 3
+    ip_detection_race_stagger: float = 0.25
+    ip_detection_timeout: float = 10.0
+    
+    # Classement adaptatif des sources : moyenne exponentielle et coupe-circuit
+    ip_source_ewma_alpha: float = 0.3
+    ip_source_failure_threshold: int = 3
+    ip_source_cooldown_seconds: int = 300
+    
+    # Client HTTP sortant partagé (détection d'IP, Slack)
+    http_client_http2: bool = False
+    http_client_max_connections: int = 100
+    http_client_max_keepalive_connections: int = 20
+    http_client_max_connections_per_host: int = 10
+    http_client_keepalive_expiry: float = 60.0
+    
+    # Outbox des notifications : livraison asynchrone avec nouvelles tentatives
+    notification_workers: int = 4
+    notification_poll_seconds: float = 2.0
+    notification_batch_size: int = 20
+    notification_max_attempts: int = 10
+    notification_backoff_base: float = 5.0
+    notification_backoff_max: float = 900.0
+    notification_retention_days: int = 7
     cors_origins: str = '["http://localhost:3000"]'
     
     @property
@@ -1,16 +1,76 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core import query_counter
 
+# Moteur synchrone : alembic, CLI, élection du leader et écoute LISTEN/NOTIFY
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pilote asynchrone correspondant à chaque base
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def _async_url() -> URL:
+    if settings.async_database_url:
+        return make_url(settings.async_database_url)
+    url = make_url(settings.database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+def _pool_options(url: URL) -> Dict[str, Any]:
+    # SQLite n'utilise pas de pool dimensionnable
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+# Moteur asynchrone : API, scheduler et services, sans bloquer la boucle d'événements
+_url = _async_url()
+async_engine = create_async_engine(_url, **_pool_options(_url))
+# Les objets restent lisibles après commit : un accès paresseux est interdit en asynchrone
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+query_counter.install(engine)
+query_counter.install(async_engine.sync_engine)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+_pool_counters = {"connects": 0, "checkouts": 0}
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    _pool_counters["connects"] += 1
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_counters["checkouts"] += 1
+
+def pool_stats() -> Dict[str, Any]:
+    """Occupancy of the async connection pool, for the diagnostics endpoint"""
+    pool = async_engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__, **_pool_counters}
+    if hasattr(pool, "checkedout"):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.db_max_overflow,
+        })
+    return stats
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
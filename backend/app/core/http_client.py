@@ -0,0 +1,65 @@
+import asyncio
+import httpx
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from app.core.config import settings
+
+# Adresse locale imposée par famille : une connexion IPv4 réutilisée ne doit pas
+# répondre à une détection IPv6 (et inversement)
+LOCAL_ADDRESSES = {
+    "ipv4": "0.0.0.0",
+    "ipv6": "::",
+}
+
+class HTTPClientManager:
+    """Application-scoped outbound HTTP clients with pooled keep-alive connections"""
+
+    def __init__(self):
+        self._clients: Dict[Optional[str], httpx.AsyncClient] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _create_client(self, family: Optional[str]) -> httpx.AsyncClient:
+        transport = httpx.AsyncHTTPTransport(
+            http2=settings.http_client_http2,
+            limits=httpx.Limits(
+                max_connections=settings.http_client_max_connections,
+                max_keepalive_connections=settings.http_client_max_keepalive_connections,
+                keepalive_expiry=settings.http_client_keepalive_expiry
+            ),
+            local_address=LOCAL_ADDRESSES.get(family)
+        )
+        return httpx.AsyncClient(transport=transport, timeout=10.0)
+
+    async def start(self):
+        self.client()
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._host_limits.clear()
+
+    def client(self, family: Optional[str] = None) -> httpx.AsyncClient:
+        # Création à la demande si utilisé hors du lifespan (CLI, scripts)
+        if family not in self._clients:
+            self._clients[family] = self._create_client(family)
+        return self._clients[family]
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(max(1, settings.http_client_max_connections_per_host))
+        return self._host_limits[host]
+
+    async def request(self, method: str, url: str, family: Optional[str] = None, **kwargs) -> httpx.Response:
+        """Send a request through the shared pool; family pins the connection to IPv4 or IPv6"""
+        async with self._host_limit(url):
+            return await self.client(family).request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+http_clients = HTTPClientManager()
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryCounter:
+    """Number of SQL statements sent while the counter was active"""
+
+    def __init__(self):
+        self.count = 0
+
+# Compteur de la tâche courante (requête HTTP, cycle du scheduler), hérité par ses sous-tâches
+_current: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count the statements executed in this context, e.g. to catch N+1 loops:
+
+        with count_queries() as queries:
+            await list_hosted_zones(...)
+        assert queries.count <= 3
+    """
+    counter = QueryCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+
+def install(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
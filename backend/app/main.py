@@ -1,16 +1,26 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api import domains, aws_accounts, auth, dashboard, users, slack_accounts, hosted_zones
+from app.core.http_client import http_clients
+from app.core.query_counter import count_queries
+from app.api import domains, aws_accounts, auth, dashboard, users, slack_accounts, hosted_zones, devices, dyndns
 from app.api import settings as settings_api
 from app.services.scheduler import scheduler
+from app.services.route53 import shutdown_executor
+from app.services.notification_outbox import notification_dispatcher
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    scheduler.start()
+    await http_clients.start()
+    if settings.scheduler_enabled:
+        await scheduler.start()
+        notification_dispatcher.start()
     yield
+    await notification_dispatcher.stop()
     scheduler.stop()
+    shutdown_executor()
+    await http_clients.close()
 
 app = FastAPI(title="DynamicRoute53", version="1.0.0", lifespan=lifespan)
 
@@ -22,6 +32,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.sql_query_count_header:
+    @app.middleware("http")
+    async def query_count_header(request: Request, call_next):
+        # Un nombre de requêtes qui croît avec le nombre de lignes signale un N+1
+        with count_queries() as queries:
+            response = await call_next(request)
+        response.headers["X-Query-Count"] = str(queries.count)
+        return response
+
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(domains.router, prefix="/api/domains", tags=["domains"])
 app.include_router(aws_accounts.router, prefix="/api/aws-accounts", tags=["aws-accounts"])
@@ -30,6 +49,9 @@ app.include_router(hosted_zones.router, prefix="/api/hosted-zones", tags=["hoste
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(settings_api.router, prefix="/api/settings", tags=["settings"])
+app.include_router(devices.router, prefix="/api/devices", tags=["devices"])
+# Chemin fixe attendu par les clients DynDNS2 (routeurs, ddclient)
+app.include_router(dyndns.router, tags=["dyndns"])
 
 @app.get("/")
 async def root():
@@ -4,5 +4,8 @@ from .slack_account import SlackAccount
 from .domain import Domain, RecordType
 from .hosted_zone import HostedZone
 from .settings import Settings
+from .device import Device
+from .notification_outbox import NotificationOutbox
 
-__all__ = ["User", "AWSAccount", "SlackAccount", "Domain", "RecordType", "HostedZone", "Settings"]
\ No newline at end of file
+__all__ = ["User", "AWSAccount", "SlackAccount", "Domain", "RecordType", "HostedZone", "Settings", "Device",
+           "NotificationOutbox"]
\ No newline at end of file
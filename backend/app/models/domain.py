@@ -23,10 +23,18 @@ class Domain(Base):
     slack_account_id = Column(Integer, ForeignKey("slack_accounts.id"), nullable=True)
     hosted_zone_id = Column(Integer, ForeignKey("hosted_zones.id"), nullable=True)  # Optional for backward compatibility
     user_id = Column(Integer, ForeignKey("users.id"))
+    # Domaine mis à jour par un équipement (DynDNS2) : exclu de la détection par le scheduler
+    device_id = Column(Integer, ForeignKey("devices.id", ondelete="SET NULL"), nullable=True)
+    # Intervalle de vérification propre au domaine (secondes), sinon scheduler.refresh_interval
+    check_interval = Column(Integer, nullable=True)
+    # Bail du réplica de scheduler qui traite ce domaine (mode réparti)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     aws_account = relationship("AWSAccount", back_populates="domains")
     slack_account = relationship("SlackAccount", back_populates="domains")
     hosted_zone = relationship("HostedZone", back_populates="domains")
+    device = relationship("Device", back_populates="domains")
     user = relationship("User")
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class NotificationOutbox(Base):
+    """Slack notification written with the DNS update, delivered later by the outbox workers"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    slack_account_id = Column(Integer, ForeignKey("slack_accounts.id", ondelete="CASCADE"), nullable=False)
+    domain_id = Column(Integer, ForeignKey("domains.id", ondelete="SET NULL"), nullable=True)
+    # Copie des champs du domaine au moment du changement
+    domain_name = Column(String, nullable=False)
+    record_type = Column(String, nullable=False)
+    ttl = Column(Integer)
+    old_ip = Column(String, nullable=True)
+    new_ip = Column(String, nullable=False)
+    # Cycle du scheduler ayant produit le changement : regroupement en digest par webhook
+    batch_id = Column(String, nullable=True, index=True)
+    status = Column(String, nullable=False, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    slack_account = relationship("SlackAccount")
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
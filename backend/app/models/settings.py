@@ -41,10 +41,52 @@ class Settings(Base):
                 "description": "List of IPv6 detection services",
                 "is_system": True
             },
+            {
+                "key": "ip_detection.source_timeouts",
+                "value": {},
+                "description": "Per-source IP detection timeout overrides in seconds",
+                "is_system": True
+            },
             {
                 "key": "scheduler.refresh_interval",
                 "value": 300,  # 5 minutes in seconds
                 "description": "DNS check interval in seconds",
                 "is_system": True
+            },
+            {
+                "key": "scheduler.adaptive_enabled",
+                "value": False,
+                "description": "Adapt the check interval to IP stability instead of using the fixed refresh interval",
+                "is_system": True
+            },
+            {
+                "key": "scheduler.min_interval",
+                "value": 30,
+                "description": "Adaptive check interval right after an IP change or detection failure, in seconds",
+                "is_system": True
+            },
+            {
+                "key": "scheduler.max_interval",
+                "value": 1800,
+                "description": "Longest adaptive check interval while the IP is stable, in seconds",
+                "is_system": True
+            },
+            {
+                "key": "scheduler.backoff_factor",
+                "value": 2.0,
+                "description": "Multiplier applied to the adaptive interval after each stable period",
+                "is_system": True
+            },
+            {
+                "key": "notifications.digest_enabled",
+                "value": True,
+                "description": "Send one Slack digest per webhook and update cycle instead of one message per domain",
+                "is_system": True
+            },
+            {
+                "key": "notifications.digest_max_items",
+                "value": 20,
+                "description": "Maximum number of domains listed in a digest before it is summarised",
+                "is_system": True
             }
         ]
\ No newline at end of file
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Optional, Set
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import engine
+
+# Canal PostgreSQL des modifications de domaines (création, édition, suppression)
+CHANNEL = "domain_changes"
+
+# Attente entre deux tentatives de reconnexion, doublée à chaque échec
+RECONNECT_BACKOFF_MIN = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+
+async def notify_domain_change(db: AsyncSession, domain_id: Optional[int] = None):
+    """Queue a change event in the current transaction; listeners receive it when it commits.
+
+    Without a domain id the event means "reload every domain".
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": CHANNEL, "payload": str(domain_id) if domain_id else "*"}
+    )
+
+class DomainEventListener:
+    """LISTEN on the domain change channel through a dedicated connection, drained without blocking"""
+
+    def __init__(self):
+        self._connection = None
+        self._connecting = False
+        self._backoff = RECONNECT_BACKOFF_MIN
+        self._retry_at = 0.0
+
+    def _enabled(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def _listen(self):
+        connection = engine.raw_connection()
+        try:
+            # Connexion dédiée : elle ne retourne jamais dans le pool en mode autocommit
+            connection.detach()
+            connection.driver_connection.autocommit = True
+            with connection.driver_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    async def drain(self) -> Set[Optional[int]]:
+        """Domain ids changed since the last call; None means the whole index must be reloaded"""
+        if not self._enabled():
+            return set()
+
+        changes: Set[Optional[int]] = set()
+        if self._connection is None:
+            # Une seule tentative à la fois, espacées tant que la base reste injoignable
+            if self._connecting or time.monotonic() < self._retry_at:
+                return changes
+            self._connecting = True
+            try:
+                # Connexion et LISTEN bloquants : hors de la boucle d'événements
+                self._connection = await asyncio.to_thread(self._listen)
+                self._backoff = RECONNECT_BACKOFF_MIN
+            except Exception as e:
+                print(f"Domain events: could not listen on {CHANNEL}, retrying in {self._backoff:.0f}s: {e}")
+                self._retry_at = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, RECONNECT_BACKOFF_MAX)
+                return changes
+            finally:
+                self._connecting = False
+            # Des événements ont pu être émis avant l'écoute
+            changes.add(None)
+
+        try:
+            driver_connection = self._connection.driver_connection
+            driver_connection.poll()
+            while driver_connection.notifies:
+                payload = driver_connection.notifies.pop(0).payload
+                changes.add(int(payload) if payload.isdigit() else None)
+        except Exception as e:
+            print(f"Domain events: listener connection lost: {e}")
+            self.close()
+            changes.add(None)
+        return changes
+
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
@@ -1,11 +1,82 @@
-import httpx
 import asyncio
-from typing import Optional, List
-from sqlalchemy.orm import Session
+import time
+from typing import Optional, List, Dict, Tuple
+from sqlalchemy import select
 from app.core.config import settings
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal
+from app.services.ip_sources import (
+    is_dns_source, is_interface_source, fetch_http, query_dns, read_interface_addresses
+)
 from app.models import Settings
 
+class SourceHealth:
+    """Latency and reliability scoreboard of one detection source"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.ewma_latency: Optional[float] = None
+        self.success_rate = 1.0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+        self.open_until = 0.0
+
+    def _observe_latency(self, latency: float):
+        alpha = settings.ip_source_ewma_alpha
+        self.ewma_latency = latency if self.ewma_latency is None else alpha * latency + (1 - alpha) * self.ewma_latency
+
+    def record_success(self, latency: float):
+        alpha = settings.ip_source_ewma_alpha
+        self._observe_latency(latency)
+        self.success_rate = alpha + (1 - alpha) * self.success_rate
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_cancelled(self, elapsed: float):
+        """A race loser was at least this slow; count it as latency, not as a failure"""
+        if self.ewma_latency is None or elapsed > self.ewma_latency:
+            self._observe_latency(elapsed)
+
+    def record_failure(self, error: str):
+        alpha = settings.ip_source_ewma_alpha
+        self.success_rate = (1 - alpha) * self.success_rate
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.last_error_at = time.time()
+        if self.consecutive_failures >= settings.ip_source_failure_threshold:
+            self.open_until = time.monotonic() + settings.ip_source_cooldown_seconds
+
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def score(self) -> float:
+        # Sources jamais essayées en premier, puis latence pondérée par la fiabilité
+        if self.ewma_latency is not None:
+            latency = self.ewma_latency
+        elif self.failures:
+            latency = settings.ip_detection_timeout
+        else:
+            return 0.0
+        return latency / max(self.success_rate, 0.05)
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "success_rate": round(self.success_rate, 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at,
+            "circuit_open": self.is_open(),
+            "circuit_open_for_seconds": max(0, round(self.open_until - time.monotonic())),
+        }
+
 class IPDetectionService:
     def __init__(self):
         # Default fallback URLs if settings not available
@@ -22,50 +93,174 @@ class IPDetectionService:
             "https://icanhazip.com", 
             "https://ident.me"
         ]
+        # Dernier résultat par famille : (ip, instant de détection)
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._health: Dict[str, Dict[str, SourceHealth]] = {"ipv4": {}, "ipv6": {}}
 
-    def _get_urls_from_settings(self, setting_key: str, default_urls: List[str]) -> List[str]:
-        """Get IP detection URLs from database settings"""
-        db = SessionLocal()
+    async def _get_setting_value(self, setting_key: str, default, expected_type: type):
         try:
-            setting = db.query(Settings).filter(Settings.key == setting_key).first()
-            if setting and isinstance(setting.value, list):
+            async with AsyncSessionLocal() as db:
+                setting = await db.scalar(select(Settings).where(Settings.key == setting_key))
+            if setting and isinstance(setting.value, expected_type):
                 return setting.value
-            return default_urls
+            return default
         except Exception:
-            return default_urls
-        finally:
-            db.close()
-
-    async def get_public_ipv4(self) -> Optional[str]:
-        urls = self._get_urls_from_settings("ip_detection.ipv4_sources", self.default_ipv4_urls)
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            for url in urls:
-                try:
-                    response = await client.get(url)
-                    if response.status_code == 200:
-                        ip = response.text.strip()
-                        if self._is_valid_ipv4(ip):
-                            return ip
-                except Exception:
-                    continue
+            return default
+
+    async def _get_urls_from_settings(self, setting_key: str, default_urls: List[str]) -> List[str]:
+        """Get IP detection URLs from database settings"""
+        return await self._get_setting_value(setting_key, default_urls, list)
+
+    async def _get_source_timeouts(self) -> Dict[str, float]:
+        """Get per-source timeout overrides (seconds) from database settings"""
+        return await self._get_setting_value("ip_detection.source_timeouts", {}, dict)
+
+    async def get_public_ipv4(self, force_refresh: bool = False, allow_stale: bool = False,
+                              max_age: Optional[float] = None) -> Optional[str]:
+        return await self._get_public_ip("ipv4", force_refresh, allow_stale, max_age)
+
+    async def get_public_ipv6(self, force_refresh: bool = False, allow_stale: bool = False,
+                              max_age: Optional[float] = None) -> Optional[str]:
+        return await self._get_public_ip("ipv6", force_refresh, allow_stale, max_age)
+
+    async def _get_public_ip(self, family: str, force_refresh: bool, allow_stale: bool,
+                             max_age: Optional[float] = None) -> Optional[str]:
+        """Return the cached IP while fresh, otherwise join (or start) the single in-flight probe.
+
+        With allow_stale, an expired IP is returned at once and refreshed in the background;
+        a cached failure is never served.
+        """
+        cached = self._cache.get(family)
+        if cached and not force_refresh:
+            ip, detected_at = cached
+            # max_age : un appelant plus exigeant que le TTL du cache (intervalle court)
+            ttl = settings.ip_cache_ttl_seconds if max_age is None else min(max_age, settings.ip_cache_ttl_seconds)
+            if time.monotonic() - detected_at < ttl:
+                return ip
+            if allow_stale and ip:
+                self._probe(family)
+                return ip
+
+        # shield : un appelant annulé ne doit pas annuler la sonde partagée
+        return await asyncio.shield(self._probe(family))
+
+    def _probe(self, family: str) -> asyncio.Task:
+        """The in-flight probe of this family, started if none is running"""
+        task = self._inflight.get(family)
+        if task is None:
+            task = asyncio.ensure_future(self._detect(family))
+            self._inflight[family] = task
+
+            def release(done: asyncio.Task):
+                if self._inflight.get(family) is done:
+                    del self._inflight[family]
+
+            task.add_done_callback(release)
+        return task
+
+    async def _detect(self, family: str) -> Optional[str]:
+        if family == "ipv4":
+            urls = await self._get_urls_from_settings("ip_detection.ipv4_sources", self.default_ipv4_urls)
+            is_valid = self._is_valid_ipv4
+        else:
+            urls = await self._get_urls_from_settings("ip_detection.ipv6_sources", self.default_ipv6_urls)
+            is_valid = self._is_valid_ipv6
+
+        sources = [(url, self._get_health(family, url)) for url in self._rank_sources(family, urls)]
+        timeouts = await self._get_source_timeouts()
+
+        # Voie rapide : les interfaces locales, sans aller-retour réseau
+        local_sources = [source for source in sources if is_interface_source(source[0])]
+        remote_sources = [source for source in sources if not is_interface_source(source[0])]
+        ip = await self._probe_sequential(family, local_sources, timeouts, is_valid)
+
+        if not ip:
+            if settings.ip_detection_strategy == "sequential":
+                ip = await self._probe_sequential(family, remote_sources, timeouts, is_valid)
+            else:
+                ip = await self._probe_race(family, remote_sources, timeouts, is_valid)
+
+        self._cache[family] = (ip, time.monotonic())
+        return ip
+
+    def _get_health(self, family: str, url: str) -> SourceHealth:
+        if url not in self._health[family]:
+            self._health[family][url] = SourceHealth(url)
+        return self._health[family][url]
+
+    def _rank_sources(self, family: str, urls: List[str]) -> List[str]:
+        """Order sources by score, skipping those whose circuit breaker is open"""
+        available = [url for url in urls if not self._get_health(family, url).is_open()]
+        if not available:
+            # Toutes les sources sont en pause : mieux vaut réessayer que ne rien détecter
+            available = list(urls)
+        return sorted(available, key=lambda url: self._get_health(family, url).score())
+
+    def get_source_stats(self) -> Dict[str, List[dict]]:
+        """Scoreboard of every known source, in current ranking order"""
+        return {
+            family: [health.to_dict() for health in sorted(sources.values(), key=lambda h: (h.is_open(), h.score()))]
+            for family, sources in self._health.items()
+        }
+
+    async def _probe_source(self, family: str, source: Tuple[str, SourceHealth],
+                            timeouts: Dict[str, float], is_valid) -> Optional[str]:
+        url, health = source
+        timeout = timeouts.get(url, settings.ip_detection_timeout)
+        started_at = time.monotonic()
+        try:
+            if is_interface_source(url):
+                candidates = read_interface_addresses(url, family)
+            elif is_dns_source(url):
+                candidates = await query_dns(url, family, timeout)
+            else:
+                candidates = await fetch_http(url, family, timeout)
+        except asyncio.CancelledError:
+            health.record_cancelled(time.monotonic() - started_at)
+            raise
+        except Exception as e:
+            health.record_failure(f"{type(e).__name__}: {e}")
+            return None
+
+        for candidate in candidates:
+            if is_valid(candidate):
+                health.record_success(time.monotonic() - started_at)
+                return candidate
+        health.record_failure("Invalid IP address in response")
         return None
 
-    async def get_public_ipv6(self) -> Optional[str]:
-        urls = self._get_urls_from_settings("ip_detection.ipv6_sources", self.default_ipv6_urls)
-        
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            for url in urls:
-                try:
-                    response = await client.get(url)
-                    if response.status_code == 200:
-                        ip = response.text.strip()
-                        if self._is_valid_ipv6(ip):
-                            return ip
-                except Exception:
-                    continue
+    async def _probe_sequential(self, family: str, sources: List[Tuple[str, SourceHealth]],
+                                timeouts: Dict[str, float], is_valid) -> Optional[str]:
+        for source in sources:
+            ip = await self._probe_source(family, source, timeouts, is_valid)
+            if ip:
+                return ip
         return None
 
+    async def _probe_race(self, family: str, sources: List[Tuple[str, SourceHealth]],
+                          timeouts: Dict[str, float], is_valid) -> Optional[str]:
+        """Happy Eyeballs style: start the next source after a short stagger or as soon
+        as one fails, keep at most race_width requests in flight, first valid answer wins"""
+        width = max(1, settings.ip_detection_race_width)
+        remaining = list(sources)
+        pending = set()
+        try:
+            while remaining or pending:
+                if remaining and len(pending) < width:
+                    source = remaining.pop(0)
+                    pending.add(asyncio.ensure_future(self._probe_source(family, source, timeouts, is_valid)))
+
+                stagger = settings.ip_detection_race_stagger if remaining and len(pending) < width else None
+                done, pending = await asyncio.wait(pending, timeout=stagger, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result():
+                        return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
     def _is_valid_ipv4(self, ip: str) -> bool:
         try:
             parts = ip.split('.')
@@ -0,0 +1,94 @@
+import asyncio
+import ipaddress
+import socket
+from typing import List
+from urllib.parse import urlsplit, parse_qs
+import psutil
+import dns.asyncquery
+import dns.message
+import dns.rdataclass
+import dns.rdatatype
+from app.core.http_client import http_clients
+
+# Formats de sources de détection :
+#   https://api.ipify.org                               réponse HTTP contenant l'IP
+#   dns://resolver1.opendns.com/myip.opendns.com        enregistrement A/AAAA renvoyant l'IP du client
+#   dns://ns1.google.com/o-o.myaddr.l.google.com?type=TXT
+#   dns://1.1.1.1/whoami.cloudflare?type=TXT&class=CH
+#   dns://127.0.0.1:5353/myip.test?type=A               serveur DNS local (tests)
+#   iface://                                            adresse publique d'une interface locale
+#   iface://eth0                                        adresse publique de l'interface eth0
+
+SOCKET_FAMILIES = {
+    "ipv4": socket.AF_INET,
+    "ipv6": socket.AF_INET6,
+}
+
+def is_dns_source(source: str) -> bool:
+    return source.startswith("dns://")
+
+def is_interface_source(source: str) -> bool:
+    return source.startswith("iface://")
+
+async def fetch_http(source: str, family: str, timeout: float) -> List[str]:
+    """Return the body of an HTTP echo service as a single candidate"""
+    response = await http_clients.get(source, family=family, timeout=timeout)
+    if response.status_code != 200:
+        raise ValueError(f"HTTP {response.status_code}")
+    return [response.text.strip()]
+
+async def query_dns(source: str, family: str, timeout: float) -> List[str]:
+    """Ask a DNS echo service for our address over UDP, sent over the detected family"""
+    parsed = urlsplit(source)
+    params = parse_qs(parsed.query)
+    qname = parsed.path.strip("/")
+    if not parsed.hostname or not qname:
+        raise ValueError("DNS source must look like dns://<resolver>/<name>")
+
+    rdtype = dns.rdatatype.from_text(params.get("type", ["A" if family == "ipv4" else "AAAA"])[0].upper())
+    rdclass = dns.rdataclass.from_text(params.get("class", ["IN"])[0].upper())
+    port = parsed.port or 53
+
+    # Le résolveur doit être joint dans la famille détectée, sinon il renvoie l'autre adresse
+    loop = asyncio.get_running_loop()
+    addresses = await loop.getaddrinfo(parsed.hostname, port, family=SOCKET_FAMILIES[family], type=socket.SOCK_DGRAM)
+    if not addresses:
+        raise ValueError(f"No {family} address for resolver {parsed.hostname}")
+    resolver = addresses[0][4][0]
+
+    query = dns.message.make_query(qname, rdtype, rdclass)
+    response = await dns.asyncquery.udp(query, resolver, port=port, timeout=timeout)
+
+    candidates = []
+    for rrset in response.answer:
+        for rdata in rrset:
+            if rrset.rdtype == dns.rdatatype.TXT:
+                candidates.append(b"".join(rdata.strings).decode().strip())
+            elif rrset.rdtype in (dns.rdatatype.A, dns.rdatatype.AAAA):
+                candidates.append(rdata.address)
+    if not candidates:
+        raise ValueError(f"No answer for {qname}")
+    return candidates
+
+def read_interface_addresses(source: str, family: str) -> List[str]:
+    """Globally routable addresses configured on local interfaces (getifaddrs)"""
+    interface = urlsplit(source).netloc
+    interfaces = psutil.net_if_addrs()
+    if interface and interface not in interfaces:
+        raise ValueError(f"Unknown interface {interface}")
+
+    candidates = []
+    for name, addresses in interfaces.items():
+        if interface and name != interface:
+            continue
+        for address in addresses:
+            if address.family != SOCKET_FAMILIES[family]:
+                continue
+            # Les adresses IPv6 de lien local portent un suffixe de zone (%eth0)
+            ip = ipaddress.ip_address(address.address.split("%")[0])
+            # is_global écarte RFC1918, CGNAT, lien local, ULA et adresses de documentation
+            if ip.is_global and not ip.is_multicast:
+                candidates.append(str(ip))
+    if not candidates:
+        raise ValueError(f"No global {family} address on {interface or 'local interfaces'}")
+    return candidates
@@ -0,0 +1,65 @@
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.core.config import settings
+from app.core.database import engine
+
+class LeaderElection:
+    """Postgres advisory-lock leader election: only the lock holder runs the scheduler jobs.
+
+    The lock lives as long as the dedicated connection that took it, so a crashed
+    leader releases it immediately and a follower takes over on its next heartbeat.
+    """
+
+    def __init__(self, lock_key: int):
+        self.lock_key = lock_key
+        self.is_leader = False
+        self._connection: Optional[Connection] = None
+
+    def _enabled(self) -> bool:
+        return settings.leader_election_enabled and engine.dialect.name == "postgresql"
+
+    def heartbeat(self) -> bool:
+        """Check the held lock, or try to take it; returns True when this process leads"""
+        if not self._enabled():
+            self.is_leader = True
+            return True
+
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                print(f"Leader election: lost database connection, stepping down: {e}")
+                self._close()
+
+        try:
+            connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            if acquired:
+                self._connection = connection
+                self.is_leader = True
+                print("Leader election: this process is now the scheduler leader")
+            else:
+                connection.close()
+        except Exception as e:
+            print(f"Leader election: could not query advisory lock: {e}")
+        return self.is_leader
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            except Exception:
+                pass
+            self._close()
+
+    def _close(self):
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self.is_leader = False
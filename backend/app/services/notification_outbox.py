@@ -0,0 +1,275 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, update, select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Domain, NotificationOutbox, Settings
+from app.services.slack_notification import SlackNotificationService
+
+# Une ligne réclamée par un worker arrêté brutalement redevient disponible après ce délai
+CLAIM_LEASE_SECONDS = 300
+PURGE_INTERVAL_SECONDS = 3600
+# En mode digest, un lot entier doit être réclamé d'un coup pour partir en un seul message
+DIGEST_CLAIM_LIMIT = 1000
+DIGEST_SETTINGS_TTL_SECONDS = 30
+# Les lignes d'un cycle en cours sont retenues jusqu'à release_batch (filet de sécurité si le processus s'arrête avant)
+BATCH_HOLD_SECONDS = 3600
+
+async def enqueue_ip_changes(db: AsyncSession, changes: List[Tuple[Domain, Optional[str], str]],
+                             batch_id: Optional[str] = None) -> int:
+    """Add outbox rows for published IP changes; call before the commit that saves the domains.
+
+    Rows sharing a batch_id (one scheduler cycle) are sent as a single digest per webhook,
+    once the cycle calls release_batch.
+    """
+    now = datetime.now(timezone.utc)
+    next_attempt_at = now + timedelta(seconds=BATCH_HOLD_SECONDS) if batch_id else now
+    rows = [
+        {
+            "slack_account_id": domain.slack_account_id,
+            "domain_id": domain.id,
+            "domain_name": domain.name,
+            "record_type": domain.record_type.value,
+            "ttl": domain.ttl,
+            "old_ip": old_ip,
+            "new_ip": new_ip,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": next_attempt_at,
+            "batch_id": batch_id,
+        }
+        # Pas de notification pour une simple réparation de dérive
+        for domain, old_ip, new_ip in changes
+        if domain.slack_account_id and old_ip != new_ip
+    ]
+    if rows:
+        await db.execute(insert(NotificationOutbox), rows)
+    return len(rows)
+
+async def release_batch(db: AsyncSession, batch_id: str):
+    """Make the rows of a finished cycle claimable together, so its digest is not split across claims"""
+    await db.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.batch_id == batch_id, NotificationOutbox.status == "pending")
+        .values(next_attempt_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+class OutboxDispatcher:
+    """Pool of async workers delivering the notification outbox with retries (at-least-once)"""
+
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+        self._digest_settings: Optional[Tuple[bool, int]] = None
+        self._digest_loaded_at = 0.0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker())
+            for _ in range(max(1, settings.notification_workers))
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self):
+        """Signal that new rows were committed, instead of waiting for the next poll"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _worker(self):
+        while True:
+            try:
+                delivered = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Notification outbox error: {e}")
+                delivered = 0
+            if delivered:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.notification_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _get_digest_settings(self, db: AsyncSession) -> Tuple[bool, int]:
+        """notifications.digest_enabled / digest_max_items, re-read every few seconds"""
+        if self._digest_settings is None or time.monotonic() - self._digest_loaded_at > DIGEST_SETTINGS_TTL_SECONDS:
+            values = {
+                setting.key: setting.value
+                for setting in (await db.scalars(select(Settings).where(Settings.key.in_([
+                    "notifications.digest_enabled", "notifications.digest_max_items"
+                ])))).all()
+            }
+            enabled = values.get("notifications.digest_enabled", True)
+            max_items = values.get("notifications.digest_max_items", 20)
+            self._digest_settings = (
+                enabled if isinstance(enabled, bool) else True,
+                max_items if isinstance(max_items, int) and not isinstance(max_items, bool) and max_items > 0 else 20
+            )
+            self._digest_loaded_at = time.monotonic()
+        return self._digest_settings
+
+    async def drain_once(self) -> int:
+        """Claim one batch of due rows and deliver them, one digest per webhook and cycle when enabled"""
+        async with AsyncSessionLocal() as db:
+            digest_enabled, max_items = await self._get_digest_settings(db)
+            rows = await self._claim(db, DIGEST_CLAIM_LIMIT if digest_enabled else settings.notification_batch_size)
+            
+            groups: Dict[Tuple, List[NotificationOutbox]] = {}
+            for row in rows:
+                if digest_enabled and row.batch_id:
+                    key = (row.slack_account_id, row.batch_id)
+                else:
+                    key = (row.slack_account_id, None, row.id)
+                groups.setdefault(key, []).append(row)
+            
+            # Compte Slack limité (429) : les messages suivants du même webhook attendent aussi
+            deferred: Dict[int, datetime] = {}
+            for group in groups.values():
+                await self._deliver(group, max_items, deferred, db)
+            await self._purge(db)
+            return len(rows)
+
+    async def _claim(self, db: AsyncSession, limit: int) -> List[NotificationOutbox]:
+        now = datetime.now(timezone.utc)
+        candidates = (
+            select(NotificationOutbox.id)
+            .where(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now)
+            .order_by(NotificationOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        claimed = (await db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(candidates.scalar_subquery()))
+            .values(
+                attempts=NotificationOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+            )
+            .returning(NotificationOutbox.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        await db.commit()
+        if not claimed:
+            return []
+        return (await db.scalars(
+            select(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(claimed))
+            .order_by(NotificationOutbox.id)
+            .options(selectinload(NotificationOutbox.slack_account))
+        )).all()
+
+    async def _deliver(self, rows: List[NotificationOutbox], max_items: int,
+                       deferred: Dict[int, datetime], db: AsyncSession):
+        """Send one message for rows of the same webhook (a single change or a cycle digest)"""
+        now = datetime.now(timezone.utc)
+        first = rows[0]
+        if first.slack_account_id in deferred:
+            for row in rows:
+                # Pas tenté : la tentative réclamée ne compte pas
+                row.attempts -= 1
+                row.next_attempt_at = deferred[first.slack_account_id]
+            await db.commit()
+            return
+
+        account = first.slack_account
+        if account is None or not account.is_active:
+            for row in rows:
+                row.status = "cancelled"
+            await db.commit()
+            return
+
+        if len(rows) == 1:
+            payload = SlackNotificationService.build_ip_change_payload(
+                first.domain_name, first.record_type, first.ttl, first.old_ip, first.new_ip
+            )
+        else:
+            payload = SlackNotificationService.build_digest_payload(
+                [(row.domain_name, row.record_type, row.old_ip, row.new_ip) for row in rows], max_items
+            )
+        result = await SlackNotificationService(account).deliver(payload)
+        attempts = max(row.attempts for row in rows)
+
+        if result.success:
+            for row in rows:
+                row.status = "sent"
+                row.sent_at = now
+                row.last_error = None
+            self.sent += 1
+        elif result.permanent_failure or attempts >= settings.notification_max_attempts:
+            for row in rows:
+                row.status = "failed"
+                row.last_error = result.error
+            self.failed += 1
+            print(f"Slack notification for {len(rows)} domain(s) failed after {attempts} attempts: {result.error}")
+        else:
+            delay = result.retry_after
+            if delay is None:
+                ceiling = min(settings.notification_backoff_max,
+                              settings.notification_backoff_base * (2 ** (attempts - 1)))
+                delay = random.uniform(ceiling / 2, ceiling)
+            next_attempt_at = now + timedelta(seconds=delay)
+            for row in rows:
+                row.next_attempt_at = next_attempt_at
+                row.last_error = result.error
+            self.retried += 1
+            if result.status_code == 429:
+                deferred[first.slack_account_id] = next_attempt_at
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(
+                        NotificationOutbox.slack_account_id == first.slack_account_id,
+                        NotificationOutbox.status == "pending",
+                        NotificationOutbox.next_attempt_at < next_attempt_at
+                    )
+                    .values(next_attempt_at=next_attempt_at)
+                    .execution_options(synchronize_session=False)
+                )
+        await db.commit()
+
+    async def _purge(self, db: AsyncSession):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.notification_retention_days)
+        await db.execute(
+            delete(NotificationOutbox)
+            .where(NotificationOutbox.status != "pending", NotificationOutbox.created_at < cutoff)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    async def stats(self, db: AsyncSession) -> Dict[str, object]:
+        counts = dict((await db.execute(
+            select(NotificationOutbox.status, func.count(NotificationOutbox.id))
+            .group_by(NotificationOutbox.status)
+        )).all())
+        return {
+            "workers": len(self._tasks),
+            "rows": counts,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+notification_dispatcher = OutboxDispatcher()
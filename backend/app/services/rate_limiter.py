@@ -0,0 +1,81 @@
+import asyncio
+import time
+from typing import Dict, Hashable
+
+class TokenBucket:
+    """Asynchronous token bucket; waiters are served in arrival order"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+        # Métriques
+        self.waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        started_at = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                while self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started_at
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def record_throttle(self):
+        """The remote side throttled us: empty the bucket so every caller slows down"""
+        self.throttled += 1
+        self.tokens = min(self.tokens, 0.0)
+
+    def record_retry(self):
+        """A throttled call is about to be sent again"""
+        self.retries += 1
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+class RateLimiterRegistry:
+    """One token bucket per key (e.g. per AWS account), created on first use"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def bucket(self, key: Hashable) -> TokenBucket:
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return self._buckets[key]
+
+    def discard(self, key: Hashable):
+        self._buckets.pop(key, None)
+
+    def stats(self) -> Dict[str, dict]:
+        return {str(key): bucket.stats() for key, bucket in self._buckets.items()}
@@ -1,31 +1,179 @@
+import asyncio
+import hashlib
+import random
 import boto3
-from typing import Optional
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional, List, Tuple, Dict, Any
+from app.core.config import settings
 from app.models import Domain, AWSAccount
+from app.services.rate_limiter import RateLimiterRegistry, TokenBucket
 
-class Route53Service:
-    def __init__(self, aws_account: AWSAccount):
-        self.client = boto3.client(
+# Limites d'un ChangeBatch Route53 (chaque UPSERT compte double)
+MAX_BATCH_RECORDS = 1000
+MAX_BATCH_VALUE_CHARS = 32000
+
+# Erreurs Route53 à réessayer après une pause
+THROTTLING_ERRORS = {"Throttling", "ThrottlingException", "PriorRequestNotComplete"}
+
+# Partagé par le scheduler, update-ip et l'actualisation des zones hébergées
+route53_rate_limiter = RateLimiterRegistry(settings.route53_rate_limit, settings.route53_rate_burst)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.route53_max_workers),
+            thread_name_prefix="route53"
+        )
+    return _executor
+
+def shutdown_executor():
+    """Stop the boto3 worker threads (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+class Route53ClientRegistry:
+    """Reusable boto3 Route53 clients, keyed by AWS account id and credential fingerprint"""
+
+    def __init__(self):
+        self._clients: Dict[Tuple[int, str], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _fingerprint(aws_account: AWSAccount) -> str:
+        material = f"{aws_account.access_key_id}:{aws_account.secret_access_key}:{aws_account.region}"
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    @staticmethod
+    def _create_client(aws_account: AWSAccount):
+        return boto3.client(
             'route53',
             aws_access_key_id=aws_account.access_key_id,
             aws_secret_access_key=aws_account.secret_access_key,
-            region_name=aws_account.region
+            region_name=aws_account.region,
+            config=Config(
+                max_pool_connections=max(1, settings.route53_max_workers),
+                # Un Route53 lent ne doit pas bloquer un thread du pool indéfiniment
+                connect_timeout=settings.route53_connect_timeout,
+                read_timeout=settings.route53_read_timeout,
+                # Les nouvelles tentatives sont gérées par Route53Service, derrière le limiteur
+                retries={'mode': 'standard', 'total_max_attempts': 1}
+            )
         )
 
+    def get_client(self, aws_account: AWSAccount):
+        # Compte pas encore enregistré (validation des identifiants) : pas de cache
+        if aws_account.id is None:
+            return self._create_client(aws_account)
+
+        key = (aws_account.id, self._fingerprint(aws_account))
+        client = self._clients.get(key)
+        if client is not None:
+            self.hits += 1
+            return client
+
+        self.misses += 1
+        # Les identifiants ont changé : oublier l'ancien client du compte
+        self.evict(aws_account.id)
+        client = self._create_client(aws_account)
+        self._clients[key] = client
+        return client
+
+    def evict(self, account_id: int):
+        for key in [key for key in self._clients if key[0] == account_id]:
+            del self._clients[key]
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+route53_clients = Route53ClientRegistry()
+
+class Route53Service:
+    def __init__(self, aws_account: AWSAccount):
+        self.client = route53_clients.get_client(aws_account)
+        if aws_account.id is None:
+            # Compte pas encore enregistré (validation des identifiants) : seau jetable, absent des diagnostics
+            self.rate_limit = TokenBucket(route53_rate_limiter.rate, route53_rate_limiter.burst)
+        else:
+            self.rate_limit = route53_rate_limiter.bucket(aws_account.id)
+
+    async def _run(self, fn, *args, **kwargs):
+        """Run a blocking boto3 call without freezing the event loop"""
+        if settings.route53_backend == "inline":
+            return fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+    async def _call(self, fn, *args, **kwargs):
+        """Rate-limited boto3 call, retried with exponential backoff and full jitter when throttled"""
+        attempt = 0
+        while True:
+            await self.rate_limit.acquire()
+            try:
+                return await self._run(fn, *args, **kwargs)
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in THROTTLING_ERRORS or attempt >= settings.route53_max_retries:
+                    raise
+                self.rate_limit.record_throttle()
+                self.rate_limit.record_retry()
+                delay = random.uniform(0, min(settings.route53_backoff_max, settings.route53_backoff_base * 2 ** attempt))
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _upsert_change(domain: Domain, new_ip: str) -> dict:
+        return {
+            'Action': 'UPSERT',
+            'ResourceRecordSet': {
+                'Name': domain.name,
+                'Type': domain.record_type.value,
+                'TTL': domain.ttl,
+                'ResourceRecords': [{'Value': new_ip}]
+            }
+        }
+
+    @staticmethod
+    def chunk_updates(updates: List[Tuple[Domain, str]]) -> List[List[Tuple[Domain, str]]]:
+        """Split UPSERTs of a single zone into ChangeBatches that fit Route53 limits"""
+        chunks = []
+        current = []
+        records = 0
+        value_chars = 0
+        for domain, new_ip in updates:
+            if current and (records + 2 > MAX_BATCH_RECORDS or
+                            value_chars + 2 * len(new_ip) > MAX_BATCH_VALUE_CHARS):
+                chunks.append(current)
+                current = []
+                records = 0
+                value_chars = 0
+            current.append((domain, new_ip))
+            records += 2
+            value_chars += 2 * len(new_ip)
+        if current:
+            chunks.append(current)
+        return chunks
+
     async def update_record(self, domain: Domain, new_ip: str) -> bool:
         try:
-            response = self.client.change_resource_record_sets(
+            response = await self._call(
+                self.client.change_resource_record_sets,
                 HostedZoneId=domain.zone_id,
                 ChangeBatch={
                     'Comment': f'DynamicRoute53 update for {domain.name}',
-                    'Changes': [{
-                        'Action': 'UPSERT',
-                        'ResourceRecordSet': {
-                            'Name': domain.name,
-                            'Type': domain.record_type.value,
-                            'TTL': domain.ttl,
-                            'ResourceRecords': [{'Value': new_ip}]
-                        }
-                    }]
+                    'Changes': [self._upsert_change(domain, new_ip)]
                 }
             )
             return response['ResponseMetadata']['HTTPStatusCode'] == 200
@@ -33,9 +181,26 @@ class Route53Service:
             print(f"Error updating DNS record: {e}")
             return False
 
+    async def update_records(self, zone_id: str, updates: List[Tuple[Domain, str]]) -> bool:
+        """Send several UPSERTs of one hosted zone in a single ChangeBatch"""
+        try:
+            response = await self._call(
+                self.client.change_resource_record_sets,
+                HostedZoneId=zone_id,
+                ChangeBatch={
+                    'Comment': f'DynamicRoute53 batch update of {len(updates)} records',
+                    'Changes': [self._upsert_change(domain, new_ip) for domain, new_ip in updates]
+                }
+            )
+            return response['ResponseMetadata']['HTTPStatusCode'] == 200
+        except Exception as e:
+            print(f"Error updating DNS records in zone {zone_id}: {e}")
+            return False
+
     async def get_current_record(self, domain: Domain) -> Optional[str]:
         try:
-            response = self.client.list_resource_record_sets(
+            response = await self._call(
+                self.client.list_resource_record_sets,
                 HostedZoneId=domain.zone_id,
                 StartRecordName=domain.name,
                 StartRecordType=domain.record_type.value,
@@ -52,13 +217,39 @@ class Route53Service:
             print(f"Error getting current DNS record: {e}")
             return None
     
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        # Route53 renvoie les noms en minuscules, avec point final et « * » échappé
+        return name.rstrip('.').lower().replace('\\052', '*')
+
+    async def list_zone_records(self, zone_id: str) -> Optional[Dict[Tuple[str, str], dict]]:
+        """Snapshot every record set of a hosted zone, indexed by (name, type)"""
+        try:
+            records = {}
+            params = {'HostedZoneId': zone_id}
+            while True:
+                page = await self._call(self.client.list_resource_record_sets, **params)
+                for record_set in page['ResourceRecordSets']:
+                    records[(self.normalize_name(record_set['Name']), record_set['Type'])] = record_set
+                if not page.get('IsTruncated'):
+                    return records
+                params['StartRecordName'] = page['NextRecordName']
+                params['StartRecordType'] = page['NextRecordType']
+                if 'NextRecordIdentifier' in page:
+                    params['StartRecordIdentifier'] = page['NextRecordIdentifier']
+                else:
+                    params.pop('StartRecordIdentifier', None)
+        except Exception as e:
+            print(f"Error listing records of zone {zone_id}: {e}")
+            return None
+
     async def list_hosted_zones(self) -> list[dict]:
         """Retrieve all hosted zones from AWS Route53"""
         try:
             zones = []
-            paginator = self.client.get_paginator('list_hosted_zones')
-            
-            for page in paginator.paginate():
+            params = {}
+            while True:
+                page = await self._call(self.client.list_hosted_zones, **params)
                 for zone in page['HostedZones']:
                     zones.append({
                         'id': zone['Id'].split('/')[-1],  # Extract zone ID from full path
@@ -67,9 +258,9 @@ class Route53Service:
                         'is_private': zone.get('Config', {}).get('PrivateZone', False),
                         'record_count': zone['ResourceRecordSetCount']
                     })
-            
-            return zones
+                if not page.get('IsTruncated'):
+                    return zones
+                params['Marker'] = page['NextMarker']
         except Exception as e:
             print(f"Error listing hosted zones: {e}")
             return []
-
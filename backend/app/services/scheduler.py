@@ -1,107 +1,890 @@
 import asyncio
+import bisect
+import heapq
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from sqlalchemy import update, case, select, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.config import settings as app_settings
+from app.core.database import AsyncSessionLocal
+from app.core.query_counter import count_queries
 from app.models import Domain, RecordType, Settings
 from app.services.route53 import Route53Service
 from app.services.ip_detection import ip_service
-from app.services.slack_notification import SlackNotificationService
-from datetime import datetime
+from app.services.notification_outbox import enqueue_ip_changes, release_batch, notification_dispatcher
+from app.services.leader import LeaderElection
+from app.services.domain_events import DomainEventListener
+from datetime import datetime, timedelta, timezone
+
+# Nombre de domaines écrits par requête UPDATE groupée
+PERSIST_CHUNK_SIZE = 500
+
+# Réglages du scheduler lus dans la table settings, avec leur valeur par défaut
+INTERVAL_SETTINGS: Dict[str, Any] = {
+    "scheduler.refresh_interval": 300,
+    "scheduler.adaptive_enabled": False,
+    "scheduler.min_interval": 30,
+    "scheduler.max_interval": 1800,
+    "scheduler.backoff_factor": 2.0,
+}
+
+class DomainIndex:
+    """In-memory index of active domains, bucketed by record type with their last published IP"""
+    
+    def __init__(self):
+        self.buckets: Optional[Dict[RecordType, Dict[int, Optional[str]]]] = None
+        # Intervalle de vérification propre à chaque domaine (None : intervalle global)
+        self.intervals: Dict[int, Optional[int]] = {}
+        # Incrémenté à chaque invalidation pour ignorer les résultats d'un cycle devenu obsolète
+        self.version = 0
+        
+    @property
+    def loaded(self) -> bool:
+        return self.buckets is not None
+        
+    async def load(self, db: AsyncSession):
+        rows = (await db.execute(select(
+            Domain.id, Domain.record_type, Domain.current_ip, Domain.check_interval
+        ).where(
+            Domain.is_active == True,
+            # Les domaines poussés par un équipement (DynDNS2) ne suivent pas l'IP détectée
+            Domain.device_id.is_(None)
+        ))).all()
+        buckets = {record_type: {} for record_type in RecordType}
+        intervals = {}
+        for domain_id, record_type, current_ip, check_interval in rows:
+            buckets[record_type][domain_id] = current_ip
+            intervals[domain_id] = check_interval
+        self.buckets = buckets
+        self.intervals = intervals
+        
+    def invalidate(self):
+        self.buckets = None
+        self.version += 1
+        
+    def record_types(self) -> List[RecordType]:
+        """Record types that have at least one active domain"""
+        return [record_type for record_type, bucket in (self.buckets or {}).items() if bucket]
+        
+    def size(self) -> int:
+        return sum(len(bucket) for bucket in (self.buckets or {}).values())
+        
+    def pending(self, record_type: RecordType, ip: str) -> List[int]:
+        if self.buckets is None:
+            return []
+        return [domain_id for domain_id, published in self.buckets[record_type].items() if published != ip]
+        
+    def mark_published(self, domain: Domain, ip: str):
+        if self.buckets is not None and domain.id in self.buckets[domain.record_type]:
+            self.buckets[domain.record_type][domain.id] = ip
+
+class DueQueue:
+    """Min-heap of domain ids keyed by their next check time (time.monotonic seconds)"""
+    
+    def __init__(self):
+        self._heap: List[Tuple[float, int]] = []
+        self._due_at: Dict[int, float] = {}
+        
+    def __len__(self) -> int:
+        return len(self._due_at)
+        
+    def __contains__(self, domain_id: int) -> bool:
+        return domain_id in self._due_at
+        
+    def ids(self) -> set:
+        return set(self._due_at)
+        
+    def schedule(self, domain_id: int, due_at: float):
+        self._due_at[domain_id] = due_at
+        heapq.heappush(self._heap, (due_at, domain_id))
+        # Les entrées périmées s'accumulent quand on replanifie avant échéance
+        if len(self._heap) > 2 * len(self._due_at) + 64:
+            self._heap = [(due, domain_id) for domain_id, due in self._due_at.items()]
+            heapq.heapify(self._heap)
+        
+    def remove(self, domain_id: int):
+        # Suppression paresseuse : l'entrée du tas est ignorée quand elle ressort
+        self._due_at.pop(domain_id, None)
+        
+    def clear(self):
+        self._heap = []
+        self._due_at = {}
+        
+    def next_due(self) -> Optional[float]:
+        while self._heap and self._due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+        
+    def pop_due(self, now: float) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, domain_id = heapq.heappop(self._heap)
+            if self._due_at.get(domain_id) == due_at:
+                del self._due_at[domain_id]
+                due.append(domain_id)
+        return due
 
 class UpdateScheduler:
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        # Un seul exemplaire de chaque tâche ; les exécutions manquées sont fusionnées en une seule
+        self.scheduler = AsyncIOScheduler(job_defaults={
+            'coalesce': True,
+            'max_instances': 1,
+            'misfire_grace_time': app_settings.scheduler_misfire_grace_seconds
+        })
         self.current_job_id = None
+        self.last_cycle = None
+        self.domain_index = DomainIndex()
+        self.due_queue = DueQueue()
+        # Domaines créés ou modifiés via l'API, à vérifier dès le prochain tick
+        self._check_now: set = set()
+        self.leader = LeaderElection(app_settings.leader_lock_key)
+        # Modifications de domaines faites par les autres processus (LISTEN/NOTIFY)
+        self.events = DomainEventListener()
+        self.interval_seconds = None
+        self.interval_settings: Dict[str, Any] = dict(INTERVAL_SETTINGS)
+        # Intervalle réellement appliqué (adaptatif ou fixe)
+        self.effective_interval: Optional[float] = None
+        self._adapted_at = 0.0
+        self._last_ips: Dict[RecordType, str] = {}
+        # Au plus un cycle de mise à jour à la fois dans ce processus ; la réconciliation
+        # a son propre verrou et ne prend celui du cycle que pour sa courte phase de réparation
+        self._cycle_lock = asyncio.Lock()
+        self._reconcile_lock = asyncio.Lock()
+        # Réconciliation interrompue par son budget : zone où reprendre le listing, par compte AWS
+        self._reconcile_resume: Dict[int, str] = {}
+        # Reprise d'un cycle interrompu par son budget de temps : dernier domaine traité
+        self._resume_after: Optional[int] = None
+        # Domaines dus non tentés faute de temps : de nouveau dus au tick suivant
+        self._deferred_ids: set = set()
+        # Dernière IP détectée par type : sondée une fois par période, quel que soit le nombre de domaines dus
+        self._ips: Dict[RecordType, Optional[str]] = {}
+        self._ips_detected_at: Optional[float] = None
+        # Identifiant de ce réplica pour les baux de domaines
+        self.replica_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # IP déjà publiée sur tous les domaines du type : un cycle sans changement s'arrête là
+        self._settled_ips: Dict[RecordType, str] = {}
         
-    def _get_refresh_interval(self) -> int:
-        """Get refresh interval from settings, default to 300 seconds (5 minutes)"""
-        db = SessionLocal()
+    async def _get_interval_settings(self) -> Dict[str, Any]:
+        """Get refresh interval and adaptive polling settings, falling back to the defaults"""
+        values = dict(INTERVAL_SETTINGS)
         try:
-            setting = db.query(Settings).filter(Settings.key == "scheduler.refresh_interval").first()
-            if setting and isinstance(setting.value, int):
-                return setting.value
-            return 300  # Default 5 minutes
+            async with AsyncSessionLocal() as db:
+                rows = (await db.scalars(select(Settings).where(Settings.key.in_(list(INTERVAL_SETTINGS))))).all()
+            for setting in rows:
+                default = INTERVAL_SETTINGS[setting.key]
+                if isinstance(default, bool):
+                    valid = isinstance(setting.value, bool)
+                elif isinstance(default, float):
+                    valid = isinstance(setting.value, (int, float)) and not isinstance(setting.value, bool)
+                else:
+                    valid = isinstance(setting.value, int) and not isinstance(setting.value, bool)
+                if valid:
+                    values[setting.key] = setting.value
         except Exception:
-            return 300
-        finally:
-            db.close()
+            pass
+        return values
+        
+    async def _apply_interval_settings(self, values: Dict[str, Any]):
+        self.interval_settings = values
+        self.interval_seconds = values["scheduler.refresh_interval"]
+        # Le mode adaptatif démarre au minimum puis recule tant que l'IP ne change pas
+        if values["scheduler.adaptive_enabled"]:
+            self.effective_interval = values["scheduler.min_interval"]
+        else:
+            self.effective_interval = self.interval_seconds
+        self._adapted_at = time.monotonic()
+        await self._store_effective_interval()
+        
+    async def _store_effective_interval(self):
+        """Publish the effective interval in the settings table for the dashboard of every process"""
+        if not self.leader.is_leader or self.effective_interval is None:
+            return
+        async with AsyncSessionLocal() as db:
+            try:
+                setting = await db.scalar(select(Settings).where(Settings.key == "scheduler.effective_interval"))
+                if setting is None:
+                    setting = Settings(
+                        key="scheduler.effective_interval",
+                        description="Check interval currently applied by the scheduler, in seconds",
+                        is_system=True
+                    )
+                    db.add(setting)
+                setting.value = round(self.effective_interval)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"Error saving effective interval: {e}")
+        
+    async def _adapt_interval(self, ips: Dict[RecordType, Optional[str]]):
+        """Adaptive polling: back to the minimum after an IP change or a failed detection, else back off geometrically"""
+        values = self.interval_settings
+        if not values["scheduler.adaptive_enabled"] or app_settings.scheduler_sharding_enabled:
+            return
+        minimum = values["scheduler.min_interval"]
+        maximum = max(minimum, values["scheduler.max_interval"])
+        now = time.monotonic()
+        
+        unsettled = any(ip is None or self._last_ips.get(record_type, ip) != ip for record_type, ip in ips.items())
+        self._last_ips.update({record_type: ip for record_type, ip in ips.items() if ip})
+        
+        if unsettled:
+            interval = minimum
+            self._adapted_at = now
+        elif now - self._adapted_at >= self.effective_interval:
+            interval = min(maximum, self.effective_interval * values["scheduler.backoff_factor"])
+            self._adapted_at = now
+        else:
+            return
         
-    def start(self):
-        interval_seconds = self._get_refresh_interval()
+        if interval == self.effective_interval:
+            return
+        shortened = interval < self.effective_interval
+        self.effective_interval = interval
+        print(f"Adaptive check interval is now {interval:.0f} seconds")
+        if shortened and self.domain_index.loaded:
+            # Les échéances lointaines calculées avec l'ancien intervalle sont ramenées au nouveau
+            self.due_queue.clear()
+            self._sync_queue()
+        await self._store_effective_interval()
+        
+    async def start(self):
+        await asyncio.to_thread(self.leader.heartbeat)
+        await self._apply_interval_settings(await self._get_interval_settings())
+        interval_seconds = self.interval_seconds
         
         self.current_job_id = 'update_domains'
+        if app_settings.scheduler_sharding_enabled:
+            self.scheduler.add_job(
+                self.update_all_domains,
+                'interval',
+                seconds=interval_seconds,
+                id=self.current_job_id
+            )
+            self.scheduler.add_job(
+                self._poll_events,
+                'interval',
+                seconds=app_settings.scheduler_tick_seconds,
+                id='domain_events'
+            )
+        else:
+            # Chaque domaine a sa propre échéance : un tick court traite ceux qui sont dus
+            self.scheduler.add_job(
+                self._tick,
+                'interval',
+                seconds=app_settings.scheduler_tick_seconds,
+                id=self.current_job_id
+            )
+        if app_settings.reconcile_interval_seconds > 0:
+            self.scheduler.add_job(
+                self.reconcile_zones,
+                'interval',
+                seconds=app_settings.reconcile_interval_seconds,
+                id='reconcile_zones'
+            )
         self.scheduler.add_job(
-            self.update_all_domains,
+            self._heartbeat,
             'interval',
-            seconds=interval_seconds,
-            id=self.current_job_id
+            seconds=app_settings.leader_heartbeat_seconds,
+            id='leader_heartbeat'
         )
         self.scheduler.start()
-        print(f"Scheduler started with {interval_seconds} seconds interval")
+        role = "leader" if self.leader.is_leader else "standby"
+        mode = " (adaptive)" if self.interval_settings["scheduler.adaptive_enabled"] else ""
+        print(f"Scheduler started with {self.effective_interval} seconds interval{mode} ({role})")
         
-    def restart_with_new_interval(self):
+    async def restart_with_new_interval(self):
         """Restart scheduler with updated interval from settings"""
-        if self.current_job_id and self.scheduler.get_job(self.current_job_id):
-            self.scheduler.remove_job(self.current_job_id)
+        await self._apply_interval_settings(await self._get_interval_settings())
+        interval_seconds = self.interval_seconds
+        if not app_settings.scheduler_sharding_enabled:
+            # Répartir à nouveau les échéances sur le nouvel intervalle
+            self.due_queue.clear()
+            if self.domain_index.loaded:
+                self._sync_queue()
+            print(f"Scheduler interval changed to {self.effective_interval} seconds")
+            return
         
-        interval_seconds = self._get_refresh_interval()
-        self.scheduler.add_job(
-            self.update_all_domains,
-            'interval', 
-            seconds=interval_seconds,
-            id=self.current_job_id
-        )
+        # Replanifier sans retirer la tâche : un cycle en cours n'est pas interrompu
+        if self.current_job_id and self.scheduler.get_job(self.current_job_id):
+            self.scheduler.reschedule_job(self.current_job_id, trigger='interval', seconds=interval_seconds)
         print(f"Scheduler restarted with {interval_seconds} seconds interval")
         
+    async def _heartbeat(self):
+        was_leader = self.leader.is_leader
+        # Connexion synchrone dédiée au verrou consultatif : hors de la boucle d'événements
+        if not await asyncio.to_thread(self.leader.heartbeat):
+            if was_leader:
+                self.events.close()
+            return
+        if not was_leader:
+            # Un autre processus a pu modifier les domaines pendant qu'on était en attente
+            self.invalidate_domain_index()
+            await self._store_effective_interval()
+        # L'intervalle a pu être modifié via l'API d'un autre processus
+        if await self._get_interval_settings() != self.interval_settings:
+            await self.restart_with_new_interval()
+        
     def stop(self):
-        self.scheduler.shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown()
+        self.events.close()
+        self.leader.release()
+        
+    def invalidate_domain_index(self, domain_id: Optional[int] = None):
+        """Forget the cached domain index after domains were created, edited or deleted"""
+        self.domain_index.invalidate()
+        self._settled_ips.clear()
+        if domain_id is not None:
+            self._check_now.add(domain_id)
+            self.due_queue.remove(domain_id)
+        
+    async def _drain_events(self) -> bool:
+        """Apply the domain changes notified by other processes; True when there were any"""
+        changes = await self.events.drain()
+        for domain_id in changes:
+            if domain_id is None:
+                self.invalidate_domain_index()
+            else:
+                # Le domaine modifié est vérifié dès ce tick, avec l'IP déjà détectée
+                self.invalidate_domain_index(domain_id)
+        return bool(changes)
+        
+    async def _poll_events(self):
+        """Sharded mode: start a cycle right away when domains changed instead of waiting for the interval"""
+        if await self._drain_events() and self.current_job_id and self.scheduler.get_job(self.current_job_id):
+            self.scheduler.modify_job(self.current_job_id, next_run_time=datetime.now(timezone.utc))
+        
+    async def _load_index(self):
+        if self.domain_index.loaded:
+            return
+        async with AsyncSessionLocal() as db:
+            await self.domain_index.load(db)
+        self._sync_queue()
+        
+    def _domain_interval(self, domain_id: int) -> int:
+        return self.domain_index.intervals.get(domain_id) or self.effective_interval or self.interval_seconds or 300
+        
+    def _next_due(self, domain_id: int, now: float) -> float:
+        jitter = max(0.0, min(app_settings.scheduler_jitter_ratio, 1.0))
+        return now + self._domain_interval(domain_id) * random.uniform(1 - jitter, 1 + jitter)
+        
+    def _sync_queue(self):
+        """Aligner la file sur l'index : nouveaux domaines planifiés, supprimés ou en pause retirés"""
+        now = time.monotonic()
+        active = self.domain_index.intervals
+        for domain_id in self.due_queue.ids() - active.keys():
+            self.due_queue.remove(domain_id)
+        for bucket in self.domain_index.buckets.values():
+            for domain_id, published in bucket.items():
+                if domain_id in self._check_now or published is None:
+                    self.due_queue.schedule(domain_id, now)
+                elif domain_id not in self.due_queue:
+                    # Premières échéances étalées sur tout l'intervalle plutôt qu'en rafale
+                    self.due_queue.schedule(domain_id, now + random.uniform(0, self._domain_interval(domain_id)))
+        self._check_now.clear()
+        
+    def queue_stats(self) -> Dict[str, Optional[float]]:
+        next_due = self.due_queue.next_due()
+        return {
+            "domains": len(self.due_queue),
+            "next_due_in_seconds": round(max(0.0, next_due - time.monotonic()), 3) if next_due is not None else None,
+        }
+        
+    async def _detect_ips(self, record_types: List[RecordType],
+                          max_age: Optional[float] = None) -> Dict[RecordType, Optional[str]]:
+        """Only probe the address families that have subscribed domains"""
+        ips = {}
+        if RecordType.A in record_types:
+            ips[RecordType.A] = await ip_service.get_public_ipv4(max_age=max_age)
+        if RecordType.AAAA in record_types:
+            ips[RecordType.AAAA] = await ip_service.get_public_ipv6(max_age=max_age)
+        return ips
+        
+    def _probe_period(self) -> float:
+        """IP probe period: the effective interval, or the shortest per-domain interval when one is shorter"""
+        period = self.effective_interval or self.interval_seconds or 300
+        shortest = min((interval for interval in self.domain_index.intervals.values() if interval), default=None)
+        return min(period, shortest) if shortest else period
+        
+    async def _refresh_ips(self, force: bool = False) -> Tuple[Dict[RecordType, Optional[str]], bool]:
+        """Detected IP of each record type in use, probed at most once per probe period; True when probed now"""
+        record_types = self.domain_index.record_types()
+        if (not force and self._ips_detected_at is not None
+                and time.monotonic() - self._ips_detected_at < self._probe_period()
+                and all(record_type in self._ips for record_type in record_types)):
+            return {record_type: self._ips[record_type] for record_type in record_types}, False
+        ips = await self._detect_ips(record_types, self._probe_period())
+        self._ips.update(ips)
+        self._ips_detected_at = time.monotonic()
+        await self._adapt_interval(ips)
+        return ips, True
+        
+    async def _tick(self) -> Dict[int, bool]:
+        """Check the domains whose due time has passed, then give them a jittered next due time"""
+        # Les domaines dus attendent dans la file pendant qu'un cycle tourne
+        if not self.leader.is_leader or self._cycle_lock.locked():
+            return {}
+        async with self._cycle_lock:
+            await self._drain_events()
+            await self._load_index()
+            ips, probed = await self._refresh_ips()
+            # Un domaine modifié via l'API pendant la détection a invalidé l'index : le recharger
+            await self._load_index()
+            now = time.monotonic()
+            if probed:
+                # Nouvelle IP détectée : tous les domaines concernés deviennent dus, sans attendre leur échéance
+                for record_type, ip in ips.items():
+                    if ip and self._settled_ips.get(record_type) != ip:
+                        for domain_id in self.domain_index.pending(record_type, ip):
+                            self.due_queue.schedule(domain_id, now)
+            due_ids = self.due_queue.pop_due(now)
+            if not due_ids:
+                return {}
+            self._deferred_ids = set()
+            try:
+                return await self._run_cycle(ips=ips, domain_ids=set(due_ids))
+            finally:
+                now = time.monotonic()
+                for domain_id in due_ids:
+                    # Un domaine supprimé ou mis en pause entre-temps sort de la file
+                    if domain_id not in self.due_queue and (
+                        not self.domain_index.loaded or domain_id in self.domain_index.intervals
+                    ):
+                        due_at = now if domain_id in self._deferred_ids else self._next_due(domain_id, now)
+                        self.due_queue.schedule(domain_id, due_at)
         
     async def update_all_domains(self):
-        db = SessionLocal()
-        try:
-            active_domains = db.query(Domain).filter(Domain.is_active == True).all()
+        if not self.leader.is_leader and not app_settings.scheduler_sharding_enabled:
+            return {}
+        if self._cycle_lock.locked():
+            print("Update cycle skipped: previous cycle still running")
+            return {}
+        async with self._cycle_lock:
+            if app_settings.scheduler_sharding_enabled:
+                return await self._update_sharded()
+            return await self._run_cycle()
+        
+    def _cycle_deadline(self, started_at: float) -> float:
+        """Time budget of a cycle: SCHEDULER_CYCLE_BUDGET_SECONDS, or the effective interval by default"""
+        budget = app_settings.scheduler_cycle_budget_seconds or self.effective_interval or self.interval_seconds or 300
+        return started_at + budget
+        
+    async def _run_cycle(self, ips: Optional[Dict[RecordType, Optional[str]]] = None,
+                         domain_ids: Optional[set] = None) -> Dict[int, bool]:
+        """Publish the detected IP on stale domains: the given due ids, or every domain for a full cycle"""
+        started_at = time.monotonic()
+        deadline = self._cycle_deadline(started_at)
+        with count_queries() as queries:
+            await self._load_index()
+            index_version = self.domain_index.version
+        
+            if ips is None:
+                ips, _ = await self._refresh_ips(force=True)
+                # L'index a pu être invalidé pendant la détection
+                await self._load_index()
+                index_version = self.domain_index.version
+        
+            pending_ips: Dict[int, str] = {}
+            for record_type, ip in ips.items():
+                if not ip or self._settled_ips.get(record_type) == ip:
+                    continue
+                for domain_id in self.domain_index.pending(record_type, ip):
+                    if domain_ids is None or domain_id in domain_ids:
+                        pending_ips[domain_id] = ip
+        
+            results: Dict[int, bool] = {}
+            if pending_ips:
+                # Les objets restent valides après chaque commit groupé
+                async with AsyncSessionLocal() as db:
+                    domains = (await db.scalars(
+                        select(Domain)
+                        .where(Domain.id.in_(list(pending_ips)), Domain.is_active == True)
+                        .options(selectinload(Domain.aws_account))
+                    )).all()
+                    pending = sorted(
+                        [(domain, pending_ips[domain.id]) for domain in domains
+                         if domain.current_ip != pending_ips[domain.id]],
+                        key=lambda item: item[0].id
+                    )
+                    if domain_ids is None and self._resume_after is not None:
+                        # Reprendre après le dernier domaine traité par le cycle interrompu
+                        pending = ([item for item in pending if item[0].id > self._resume_after] +
+                                   [item for item in pending if item[0].id <= self._resume_after])
+                    results = await self._update_pending(pending, db, deadline)
             
-            current_ipv4 = await ip_service.get_public_ipv4()
-            current_ipv6 = await ip_service.get_public_ipv6()
+                attempted = [domain.id for domain, _ in pending if domain.id in results]
+                deferred = len(pending) - len(attempted)
+                self._deferred_ids = {domain.id for domain, _ in pending if domain.id not in results}
+                if domain_ids is None:
+                    self._resume_after = attempted[-1] if deferred and attempted else None
+            else:
+                deferred = 0
+                self._deferred_ids = set()
+                if domain_ids is None:
+                    self._resume_after = None
+        
+            # Un type est « stable » si tous ses domaines portent l'IP détectée
+            if self.domain_index.version == index_version:
+                for record_type, ip in ips.items():
+                    if ip and not self.domain_index.pending(record_type, ip):
+                        self._settled_ips[record_type] = ip
+        
+        self._finish_cycle(started_at, len(pending_ips), results, deferred, queries.count)
+        return results
+        
+    def _finish_cycle(self, started_at: float, checked: int, results: Dict[int, bool],
+                      deferred: int = 0, queries: int = 0):
+        elapsed = time.monotonic() - started_at
+        updated = sum(1 for success in results.values() if success)
+        self.last_cycle = {
+            "finished_at": datetime.utcnow(),
+            "duration_seconds": round(elapsed, 3),
+            "checked": checked,
+            "updated": updated,
+            "failed": len(results) - updated,
+            "deferred": deferred,
+            # Doit rester constant quand le nombre de domaines augmente (pas de N+1)
+            "queries": queries,
+        }
+        if checked:
+            print(f"Update cycle finished in {elapsed:.2f}s: "
+                  f"{updated} updated, {len(results) - updated} failed, {checked} checked, {queries} SQL queries")
+        if deferred:
+            print(f"Cycle time budget exhausted: {deferred} records deferred to the next cycle")
+        
+    async def _update_sharded(self) -> Dict[int, bool]:
+        """Claim stale domains in leased batches so several replicas share one cycle"""
+        started_at = time.monotonic()
+        deadline = self._cycle_deadline(started_at)
+        with count_queries() as queries:
+            async with AsyncSessionLocal() as db:
+                record_types = (await db.scalars(select(Domain.record_type).where(
+                    Domain.is_active == True, Domain.device_id.is_(None)
+                ).distinct())).all()
+            ips = {record_type: ip for record_type, ip in (await self._detect_ips(record_types, self.interval_seconds)).items() if ip}
+        
+            results: Dict[int, bool] = {}
+            checked = 0
+            deferred = 0
+            cycle_id = uuid.uuid4().hex
+            while ips and time.monotonic() < deadline:
+                async with AsyncSessionLocal() as db:
+                    claimed = await self._claim_batch(ips, db)
+                    if not claimed:
+                        break
+                    checked += len(claimed)
+                    domains = (await db.scalars(
+                        select(Domain).where(Domain.id.in_(claimed)).options(selectinload(Domain.aws_account))
+                    )).all()
+                    batch_results = await self._update_pending(
+                        [(domain, ips[domain.record_type]) for domain in domains], db, deadline, cycle_id
+                    )
+                    results.update(batch_results)
+                    # Les échecs gardent leur bail jusqu'à expiration : ils seront repris au prochain cycle.
+                    # Les domaines non tentés faute de temps sont rendus tout de suite aux autres réplicas.
+                    skipped = [domain_id for domain_id in claimed if domain_id not in batch_results]
+                    deferred += len(skipped)
+                    await self._release_leases(
+                        [domain_id for domain_id, success in batch_results.items() if success] + skipped, db
+                    )
+            
+            # Un seul digest pour tous les lots réclamés pendant ce cycle
+            if any(results.values()):
+                async with AsyncSessionLocal() as db:
+                    await self._release_notifications(cycle_id, db)
+        
+        self._finish_cycle(started_at, checked, results, deferred, queries.count)
+        return results
+        
+    async def _claim_batch(self, ips: Dict[RecordType, str], db: AsyncSession) -> List[int]:
+        """Lease a batch of active domains whose published IP differs from the detected one"""
+        now = datetime.now(timezone.utc)
+        stale = or_(*[
+            and_(Domain.record_type == record_type, Domain.current_ip.is_distinct_from(ip))
+            for record_type, ip in ips.items()
+        ])
+        candidates = (
+            select(Domain.id)
+            .where(
+                Domain.is_active == True,
+                Domain.device_id.is_(None),
+                or_(Domain.lease_expires_at.is_(None), Domain.lease_expires_at < now),
+                stale
+            )
+            .order_by(Domain.id)
+            .limit(app_settings.scheduler_lease_batch_size)
+            # Les lignes verrouillées par un autre réplica sont ignorées, pas attendues
+            .with_for_update(skip_locked=True)
+        )
+        claimed = (await db.execute(
+            update(Domain)
+            .where(Domain.id.in_(candidates.scalar_subquery()))
+            .values(
+                lease_owner=self.replica_id,
+                lease_expires_at=now + timedelta(seconds=app_settings.scheduler_lease_seconds),
+                # Un bail ne modifie pas le domaine lui-même
+                updated_at=Domain.updated_at
+            )
+            .returning(Domain.id)
+            .execution_options(synchronize_session=False)
+        )).scalars().all()
+        await db.commit()
+        return claimed
+        
+    async def _release_leases(self, domain_ids: List[int], db: AsyncSession):
+        if not domain_ids:
+            return
+        await db.execute(
+            update(Domain)
+            .where(Domain.id.in_(domain_ids), Domain.lease_owner == self.replica_id)
+            .values(lease_owner=None, lease_expires_at=None, updated_at=Domain.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+            
+    async def reconcile_zones(self) -> Dict[int, bool]:
+        """Compare live Route53 records with Domain.current_ip, one zone listing per hosted zone"""
+        if not self.leader.is_leader:
+            return {}
+        if self._reconcile_lock.locked():
+            print("Reconciliation skipped: previous run still running")
+            return {}
+        # Verrou propre : les listings lents ne bloquent pas les ticks de mise à jour
+        async with self._reconcile_lock:
+            return await self._reconcile_zones()
+            
+    def _reconcile_deadline(self, started_at: float) -> float:
+        """Time budget of a reconciliation: RECONCILE_BUDGET_SECONDS, or the reconciliation interval by default"""
+        budget = app_settings.reconcile_budget_seconds or app_settings.reconcile_interval_seconds or 3600
+        return started_at + budget
+            
+    async def _reconcile_zones(self) -> Dict[int, bool]:
+        started_at = time.monotonic()
+        deadline = self._reconcile_deadline(started_at)
+        with count_queries() as queries:
+            async with AsyncSessionLocal() as db:
+                domains = (await db.scalars(
+                    select(Domain)
+                    .where(Domain.is_active == True, Domain.current_ip.isnot(None))
+                    .options(selectinload(Domain.aws_account))
+                )).all()
+            
+            zones: Dict[Tuple[int, str], List[Domain]] = {}
+            for domain in domains:
+                zones.setdefault((domain.aws_account_id, domain.zone_id), []).append(domain)
+            
+            # Chaque compte reprend à la première zone non listée la dernière fois : aucune n'est toujours en fin de file
+            account_zones: Dict[int, List[str]] = {}
+            for account_id, zone_id in sorted(zones):
+                account_zones.setdefault(account_id, []).append(zone_id)
+            order: List[Tuple[int, str]] = []
+            for account_id, zone_ids in account_zones.items():
+                resume = self._reconcile_resume.get(account_id)
+                start = bisect.bisect_left(zone_ids, resume) % len(zone_ids) if resume else 0
+                order += [(account_id, zone_id) for zone_id in zone_ids[start:] + zone_ids[:start]]
+            account_limits: Dict[int, asyncio.Semaphore] = {}
+            drift: List[Tuple[Domain, str]] = []
+            deferred_zones: set = set()
+            resume_at: Dict[int, str] = {}
+            
+            async def snapshot(key: Tuple[int, str], zone_domains: List[Domain]):
+                first_domain = zone_domains[0]
+                if first_domain.aws_account_id not in account_limits:
+                    account_limits[first_domain.aws_account_id] = asyncio.Semaphore(
+                        max(1, app_settings.scheduler_max_concurrency_per_account)
+                    )
+                async with account_limits[first_domain.aws_account_id]:
+                    # Budget épuisé : les zones restantes attendent la prochaine réconciliation
+                    if time.monotonic() >= deadline:
+                        deferred_zones.add(key)
+                        # Le sémaphore sert les zones dans l'ordre : la première reportée marque la reprise
+                        resume_at.setdefault(key[0], key[1])
+                        return
+                    route53_service = Route53Service(first_domain.aws_account)
+                    records = await route53_service.list_zone_records(first_domain.zone_id)
+                if records is None:
+                    return
+                
+                for domain in zone_domains:
+                    live = records.get((Route53Service.normalize_name(domain.name), domain.record_type.value))
+                    values = [record['Value'] for record in (live or {}).get('ResourceRecords', [])]
+                    if values != [domain.current_ip] or live.get('TTL') != domain.ttl:
+                        drift.append((domain, domain.current_ip))
+            
+            await asyncio.gather(*(snapshot(key, zones[key]) for key in order))
+            self._reconcile_resume = resume_at
+            
+            results: Dict[int, bool] = {}
+            if drift and time.monotonic() < deadline:
+                # Réparation courte sous le verrou du cycle : elle ne doit pas croiser une publication d'IP
+                async with self._cycle_lock:
+                    async with AsyncSessionLocal() as db:
+                        current = dict((await db.execute(
+                            select(Domain.id, Domain.current_ip).where(Domain.id.in_([domain.id for domain, _ in drift]))
+                        )).all())
+                        # Un domaine republié depuis le listing n'est plus en dérive
+                        drift = [(domain, ip) for domain, ip in drift if current.get(domain.id) == ip]
+                        if drift:
+                            results = await self._update_pending(drift, db, deadline)
+            
+            repaired = sum(1 for success in results.values() if success)
+            print(f"Reconciliation finished in {time.monotonic() - started_at:.2f}s: "
+                  f"{len(zones)} zones, {len(domains)} records, {len(drift)} drifted, {repaired} repaired, "
+                  f"{len(deferred_zones)} zones deferred, {queries.count} SQL queries")
+            return results
+            
+    async def _update_pending(self, pending: List[Tuple[Domain, str]], db: AsyncSession,
+                              deadline: Optional[float] = None, batch_id: Optional[str] = None) -> Dict[int, bool]:
+        """Publier les enregistrements par lots de zone, en parallèle, puis les enregistrer en masse.
+        
+        Passé `deadline`, aucun nouveau lot n'est lancé : les domaines non tentés sont absents du résultat.
+        La transaction en cours de `db` est validée avant les appels Route53."""
+        cycle_limit = asyncio.Semaphore(max(1, app_settings.scheduler_max_concurrency))
+        account_limits: Dict[int, asyncio.Semaphore] = {}
+        results: Dict[int, bool] = {}
+        published: List[Tuple[Domain, str]] = []
+        
+        def expired() -> bool:
+            return deadline is not None and time.monotonic() >= deadline
+        
+        def account_limit(domain: Domain) -> asyncio.Semaphore:
+            if domain.aws_account_id not in account_limits:
+                account_limits[domain.aws_account_id] = asyncio.Semaphore(
+                    max(1, app_settings.scheduler_max_concurrency_per_account)
+                )
+            return account_limits[domain.aws_account_id]
+        
+        async def publish_one(domain: Domain, new_ip: str):
+            async with cycle_limit, account_limit(domain):
+                if expired():
+                    return
+                results[domain.id] = False
+                if await self._publish_record(domain, new_ip):
+                    published.append((domain, new_ip))
+        
+        async def publish_chunk(chunk: List[Tuple[Domain, str]]):
+            first_domain = chunk[0][0]
+            if len(chunk) == 1:
+                await publish_one(*chunk[0])
+                return
             
-            for domain in active_domains:
+            async with cycle_limit, account_limit(first_domain):
+                if expired():
+                    return
+                for domain, _ in chunk:
+                    results[domain.id] = False
                 try:
-                    if domain.record_type == RecordType.A and current_ipv4:
-                        if domain.current_ip != current_ipv4:
-                            await self.update_domain_record(domain, current_ipv4, db)
-                    elif domain.record_type == RecordType.AAAA and current_ipv6:
-                        if domain.current_ip != current_ipv6:
-                            await self.update_domain_record(domain, current_ipv6, db)
+                    route53_service = Route53Service(first_domain.aws_account)
+                    success = await route53_service.update_records(first_domain.zone_id, chunk)
                 except Exception as e:
-                    print(f"Error updating domain {domain.name}: {e}")
-                    
-        finally:
-            db.close()
+                    print(f"Error updating zone {first_domain.zone_id}: {e}")
+                    success = False
+            
+            if not success:
+                # Un lot rejeté ne doit pas bloquer les autres enregistrements de la zone
+                print(f"Batch update failed for zone {first_domain.zone_id}, "
+                      f"falling back to {len(chunk)} single-record updates")
+                await asyncio.gather(*(publish_one(domain, new_ip) for domain, new_ip in chunk))
+                return
             
-    async def update_domain_record(self, domain: Domain, new_ip: str, db: Session):
+            published.extend(chunk)
+        
+        zones: Dict[Tuple[int, str], List[Tuple[Domain, str]]] = {}
+        for domain, new_ip in pending:
+            zones.setdefault((domain.aws_account_id, domain.zone_id), []).append((domain, new_ip))
+        
+        # Fin de la transaction de lecture : la connexion retourne au pool pendant les appels Route53
+        # (un Route53 lent ou limité ne doit pas épuiser le pool) ; l'écriture en reprend une ensuite
+        await db.commit()
+        chunks = [chunk for updates in zones.values() for chunk in Route53Service.chunk_updates(updates)]
+        await asyncio.gather(*(publish_chunk(chunk) for chunk in chunks))
+        
+        # Les notifications d'un même cycle partent en un seul digest par webhook
+        own_batch = batch_id is None
+        batch_id = batch_id or uuid.uuid4().hex
+        for domain, _, _ in await self._persist_updates(published, db, batch_id):
+            results[domain.id] = True
+        if own_batch and any(results.values()):
+            await self._release_notifications(batch_id, db)
+        return results
+        
+    async def _release_notifications(self, batch_id: str, db: AsyncSession):
+        """Hand a finished cycle's notifications to the outbox workers, all at once"""
+        try:
+            await release_batch(db, batch_id)
+        except Exception as e:
+            await db.rollback()
+            print(f"Error releasing notifications of batch {batch_id}: {e}")
+            return
+        notification_dispatcher.wake()
+            
+    async def publish_updates(self, pending: List[Tuple[Domain, str]], db: AsyncSession) -> Dict[int, bool]:
+        """Publish pushed IPs right away through the batched cycle pipeline (no cycle lock, no budget)"""
+        return await self._update_pending(pending, db)
+            
+    async def _publish_record(self, domain: Domain, new_ip: str) -> bool:
         try:
-            old_ip = domain.current_ip
             route53_service = Route53Service(domain.aws_account)
-            success = await route53_service.update_record(domain, new_ip)
+            if await route53_service.update_record(domain, new_ip):
+                return True
+            print(f"Failed to update {domain.name}")
+            return False
+        except Exception as e:
+            print(f"Error updating {domain.name}: {e}")
+            return False
             
-            if success:
-                domain.current_ip = new_ip
-                domain.last_updated = datetime.utcnow()
-                db.commit()
-                print(f"Updated {domain.name} to {new_ip}")
-                
-                # Envoyer la notification Slack si configurée
-                if domain.slack_account and domain.slack_account.is_active:
+    async def _persist_updates(self, published: List[Tuple[Domain, str]], db: AsyncSession,
+                         batch_id: Optional[str] = None) -> List[Tuple[Domain, Optional[str], str]]:
+        """Write current_ip/last_updated with one UPDATE per chunk; a failing chunk is retried row by row.
+        
+        Slack notifications go to the outbox in the same transaction, delivered by the outbox workers."""
+        saved = []
+        now = datetime.utcnow()
+        
+        async def write(rows: List[Tuple[Domain, str]]):
+            # Savepoint : un lot rejeté est annulé sans expirer les objets chargés (pas de rechargement en asynchrone)
+            async with db.begin_nested():
+                await db.execute(
+                    update(Domain)
+                    .where(Domain.id.in_([domain.id for domain, _ in rows]))
+                    .values(
+                        current_ip=case({domain.id: new_ip for domain, new_ip in rows}, value=Domain.id),
+                        last_updated=now
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await enqueue_ip_changes(db, [(domain, domain.current_ip, new_ip) for domain, new_ip in rows], batch_id)
+            await db.commit()
+            for domain, new_ip in rows:
+                old_ip = domain.current_ip
+                # Synchroniser l'objet chargé sans le marquer comme modifié
+                set_committed_value(domain, 'current_ip', new_ip)
+                set_committed_value(domain, 'last_updated', now)
+                self.domain_index.mark_published(domain, new_ip)
+                saved.append((domain, old_ip, new_ip))
+        
+        for start in range(0, len(published), PERSIST_CHUNK_SIZE):
+            chunk = published[start:start + PERSIST_CHUNK_SIZE]
+            try:
+                await write(chunk)
+            except Exception as e:
+                print(f"Error saving {len(chunk)} updates in bulk, retrying one by one: {e}")
+                for row in chunk:
                     try:
-                        slack_service = SlackNotificationService(domain.slack_account)
-                        await slack_service.send_ip_change_notification(domain, old_ip, new_ip)
-                        print(f"Slack notification sent for {domain.name}")
+                        await write([row])
                     except Exception as e:
-                        print(f"Error sending Slack notification for {domain.name}: {e}")
-            else:
-                print(f"Failed to update {domain.name}")
-                
-        except Exception as e:
-            print(f"Error updating {domain.name}: {e}")
-
+                        print(f"Error saving update for {row[0].name}: {e}")
+        
+        if saved:
+            print(f"Saved {len(saved)} DNS updates")
+        return saved
+            
 scheduler = UpdateScheduler()
\ No newline at end of file
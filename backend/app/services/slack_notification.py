@@ -1,84 +1,148 @@
-import httpx
 import json
-from typing import Optional
-from app.models import SlackAccount, Domain
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from app.core.http_client import http_clients
+from app.models import SlackAccount
+
+@dataclass
+class SlackDelivery:
+    """Result of one webhook POST, as needed by the outbox retry policy"""
+    success: bool
+    status_code: Optional[int] = None
+    retry_after: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def permanent_failure(self) -> bool:
+        # 4xx hors 429 : le webhook est révoqué ou le message invalide, réessayer ne sert à rien
+        return self.status_code is not None and 400 <= self.status_code < 500 and self.status_code != 429
 
 class SlackNotificationService:
     def __init__(self, slack_account: SlackAccount):
         self.webhook_url = slack_account.webhook_url
         self.account_name = slack_account.name
 
-    async def send_ip_change_notification(self, domain: Domain, old_ip: Optional[str], new_ip: str) -> bool:
-        """Envoyer une notification de changement d'IP"""
+    async def deliver(self, payload: dict) -> SlackDelivery:
+        """POST a payload to the webhook and report the status and Retry-After delay"""
         try:
-            # Préparer le message
-            if old_ip:
-                title = f"🔄 Changement d'IP détecté"
-                message = f"Le domaine `{domain.name}` a changé d'IP"
-                fields = [
-                    {
-                        "title": "Ancienne IP",
-                        "value": f"`{old_ip}`",
-                        "short": True
-                    },
-                    {
-                        "title": "Nouvelle IP",
-                        "value": f"`{new_ip}`",
-                        "short": True
-                    }
-                ]
-                color = "#ff9500"  # Orange
-            else:
-                title = f"🆕 Première configuration IP"
-                message = f"Le domaine `{domain.name}` a été configuré pour la première fois"
-                fields = [
-                    {
-                        "title": "IP assignée",
-                        "value": f"`{new_ip}`",
-                        "short": True
-                    }
-                ]
-                color = "#36a64f"  # Vert
+            response = await http_clients.post(
+                self.webhook_url,
+                json=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=10.0
+            )
+        except Exception as e:
+            print(f"Erreur lors de l'envoi de la notification Slack: {e}")
+            return SlackDelivery(success=False, error=str(e))
+        
+        retry_after = None
+        try:
+            retry_after = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+        return SlackDelivery(
+            success=response.status_code == 200,
+            status_code=response.status_code,
+            retry_after=retry_after,
+            error=None if response.status_code == 200 else f"HTTP {response.status_code}: {response.text[:200]}"
+        )
 
-            # Construire le payload Slack
-            payload = {
-                "username": "DynamicRoute53",
-                "icon_emoji": ":globe_with_meridians:",
-                "attachments": [
-                    {
-                        "color": color,
-                        "title": title,
-                        "text": message,
-                        "fields": fields + [
-                            {
-                                "title": "Type d'enregistrement",
-                                "value": domain.record_type.value,
-                                "short": True
-                            },
-                            {
-                                "title": "TTL",
-                                "value": f"{domain.ttl}s",
-                                "short": True
-                            }
-                        ],
-                        "footer": "DynamicRoute53",
-                        "ts": int(__import__('time').time())
-                    }
-                ]
-            }
+    @staticmethod
+    def build_ip_change_payload(domain_name: str, record_type: str, ttl: Optional[int],
+                                old_ip: Optional[str], new_ip: str) -> dict:
+        """Message Slack d'un changement d'IP"""
+        if old_ip:
+            title = f"🔄 Changement d'IP détecté"
+            message = f"Le domaine `{domain_name}` a changé d'IP"
+            fields = [
+                {
+                    "title": "Ancienne IP",
+                    "value": f"`{old_ip}`",
+                    "short": True
+                },
+                {
+                    "title": "Nouvelle IP",
+                    "value": f"`{new_ip}`",
+                    "short": True
+                }
+            ]
+            color = "#ff9500"  # Orange
+        else:
+            title = f"🆕 Première configuration IP"
+            message = f"Le domaine `{domain_name}` a été configuré pour la première fois"
+            fields = [
+                {
+                    "title": "IP assignée",
+                    "value": f"`{new_ip}`",
+                    "short": True
+                }
+            ]
+            color = "#36a64f"  # Vert
 
-            # Envoyer la notification
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    self.webhook_url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                return response.status_code == 200
+        # Construire le payload Slack
+        return {
+            "username": "DynamicRoute53",
+            "icon_emoji": ":globe_with_meridians:",
+            "attachments": [
+                {
+                    "color": color,
+                    "title": title,
+                    "text": message,
+                    "fields": fields + [
+                        {
+                            "title": "Type d'enregistrement",
+                            "value": record_type,
+                            "short": True
+                        },
+                        {
+                            "title": "TTL",
+                            "value": f"{ttl}s",
+                            "short": True
+                        }
+                    ],
+                    "footer": "DynamicRoute53",
+                    "ts": int(time.time())
+                }
+            ]
+        }
 
-        except Exception as e:
-            print(f"Erreur lors de l'envoi de la notification Slack: {e}")
-            return False
+    @staticmethod
+    def build_digest_payload(changes: List[Tuple[str, str, Optional[str], str]], max_items: int) -> dict:
+        """Un seul message pour tous les changements d'un cycle : résumé par IP puis liste tronquée"""
+        by_ip: Dict[Tuple[str, str], int] = {}
+        for _, record_type, _, new_ip in changes:
+            by_ip[(record_type, new_ip)] = by_ip.get((record_type, new_ip), 0) + 1
+        
+        summary = [
+            {
+                "title": f"Nouvelle IP ({record_type})",
+                "value": f"`{new_ip}` : {count} domaine{'s' if count > 1 else ''}",
+                "short": True
+            }
+            for (record_type, new_ip), count in sorted(by_ip.items())
+        ]
+        lines = [
+            f"• `{domain_name}` ({record_type}) : `{old_ip or '—'}` → `{new_ip}`"
+            for domain_name, record_type, old_ip, new_ip in changes[:max_items]
+        ]
+        if len(changes) > max_items:
+            lines.append(f"… et {len(changes) - max_items} autre(s)")
+        
+        return {
+            "username": "DynamicRoute53",
+            "icon_emoji": ":globe_with_meridians:",
+            "attachments": [
+                {
+                    "color": "#ff9500",
+                    "title": f"🔄 {len(changes)} domaines mis à jour",
+                    "text": "\n".join(lines),
+                    "fields": summary,
+                    "footer": "DynamicRoute53",
+                    "ts": int(time.time())
+                }
+            ]
+        }
 
     async def test_webhook(self) -> bool:
         """Tester la connexion webhook"""
@@ -96,13 +160,13 @@ class SlackNotificationService:
                 ]
             }
 
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    self.webhook_url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                return response.status_code == 200
+            response = await http_clients.post(
+                self.webhook_url,
+                json=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=10.0
+            )
+            return response.status_code == 200
 
         except Exception as e:
             print(f"Erreur lors du test webhook Slack: {e}")
@@ -0,0 +1,29 @@
+import asyncio
+import signal
+from app.core.http_client import http_clients
+from app.services.route53 import shutdown_executor
+from app.services.scheduler import scheduler
+from app.services.notification_outbox import notification_dispatcher
+
+async def main():
+    """Run the DNS update scheduler without the API (python -m app.worker)"""
+    await http_clients.start()
+    await scheduler.start()
+    notification_dispatcher.start()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    try:
+        await stop.wait()
+    finally:
+        await notification_dispatcher.stop()
+        scheduler.stop()
+        shutdown_executor()
+        await http_clients.close()
+        print("Worker stopped")
+
+if __name__ == "__main__":
+    asyncio.run(main())
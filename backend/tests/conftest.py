@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+
+# Base SQLite jetable, configurée avant le premier import de l'application
+_db_dir = tempfile.mkdtemp(prefix="dynamicroute-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["SQL_QUERY_COUNT_HEADER"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import get_current_user
+from app.main import app
+from app.models import AWSAccount, User
+from app.services import route53
+from app.services.ip_detection import ip_service
+
+class FakeRoute53Client:
+    """Stand-in for the boto3 Route53 client, recording every change batch"""
+
+    def __init__(self):
+        self.calls = []
+        # Enregistrements renvoyés par zone, et zones listées dans l'ordre
+        self.record_sets = {}
+        self.listed = []
+        self.list_delay = 0.0
+
+    def change_resource_record_sets(self, HostedZoneId, ChangeBatch):
+        self.calls.append((HostedZoneId, len(ChangeBatch["Changes"])))
+        return {"ChangeInfo": {"Status": "PENDING"}, "ResponseMetadata": {"HTTPStatusCode": 200}}
+
+    def list_resource_record_sets(self, HostedZoneId, **kwargs):
+        time.sleep(self.list_delay)
+        self.listed.append(HostedZoneId)
+        return {"ResourceRecordSets": self.record_sets.get(HostedZoneId, []), "IsTruncated": False}
+
+@pytest.fixture(autouse=True)
+def database():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def user(db):
+    user = User(username="alice", email="alice@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def aws_account(db, user):
+    account = AWSAccount(name="main", access_key_id="AKIATEST", secret_access_key="secret", user_id=user.id)
+    db.add(account)
+    db.commit()
+    return account
+
+@pytest.fixture
+def client(user):
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def fake_route53(monkeypatch):
+    fake = FakeRoute53Client()
+    monkeypatch.setattr(route53.route53_clients, "get_client", lambda aws_account: fake)
+    return fake
+
+@pytest.fixture
+def public_ips(monkeypatch):
+    """Public IPs returned by IP detection; change them to trigger updates"""
+    ips = {"ipv4": "203.0.113.10", "ipv6": "2001:db8::10"}
+
+    async def ipv4(*args, **kwargs):
+        return ips["ipv4"]
+
+    async def ipv6(*args, **kwargs):
+        return ips["ipv6"]
+
+    monkeypatch.setattr(ip_service, "get_public_ipv4", ipv4)
+    monkeypatch.setattr(ip_service, "get_public_ipv6", ipv6)
+    return ips
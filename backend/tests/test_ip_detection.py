@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from app.core.config import settings
+from app.services.ip_detection import IPDetectionService
+
+DAY = 24 * 3600
+
+def service_with_probe(monkeypatch, ip):
+    service = IPDetectionService()
+    probes = []
+
+    async def detect(family):
+        probes.append(family)
+        await asyncio.sleep(0.01)
+        service._cache[family] = (ip, time.monotonic())
+        return ip
+
+    monkeypatch.setattr(service, "_detect", detect)
+    return service, probes
+
+def test_stale_ip_is_served_and_refreshed_in_background(monkeypatch):
+    service, probes = service_with_probe(monkeypatch, "203.0.113.2")
+    service._cache["ipv4"] = ("203.0.113.1", time.monotonic() - DAY)
+
+    async def scenario():
+        stale = await service.get_public_ipv4(allow_stale=True)
+        await asyncio.sleep(0.05)
+        return stale, await service.get_public_ipv4(allow_stale=True)
+
+    stale, refreshed = asyncio.run(scenario())
+
+    assert stale == "203.0.113.1"
+    assert refreshed == "203.0.113.2"
+    assert probes == ["ipv4"]
+
+def test_fresh_ip_is_served_without_probe(monkeypatch):
+    service, probes = service_with_probe(monkeypatch, "203.0.113.2")
+    service._cache["ipv4"] = ("203.0.113.1", time.monotonic())
+
+    assert asyncio.run(service.get_public_ipv4(allow_stale=True)) == "203.0.113.1"
+    assert probes == []
+
+def test_cached_failure_is_never_served_as_stale(monkeypatch):
+    service, probes = service_with_probe(monkeypatch, "203.0.113.2")
+    service._cache["ipv4"] = (None, time.monotonic() - settings.ip_cache_ttl_seconds - 1)
+
+    assert asyncio.run(service.get_public_ipv4(allow_stale=True)) == "203.0.113.2"
+    assert probes == ["ipv4"]
@@ -0,0 +1,91 @@
+import asyncio
+import socket
+import threading
+
+import dns.message
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+import pytest
+
+from app.services.ip_sources import query_dns
+
+# Réponses du serveur DNS local : (nom, type, classe) -> valeurs
+ANSWERS = {
+    ("myip.test.", "A", "IN"): ["203.0.113.7"],
+    ("myip.test.", "AAAA", "IN"): ["2001:db8::7"],
+    ("o-o.myaddr.test.", "TXT", "IN"): ['"198.51.100.7"'],
+    ("whoami.test.", "TXT", "CH"): ['"192.0.2.7"'],
+}
+
+def start_dns_stub(host: str):
+    """UDP DNS server on a loopback address answering from ANSWERS; yields its port and the questions seen"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.bind((host, 0))
+    sock.settimeout(0.1)
+    questions = []
+    stopped = threading.Event()
+
+    def serve():
+        while not stopped.is_set():
+            try:
+                data, address = sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            query = dns.message.from_wire(data)
+            question = query.question[0]
+            key = (question.name.to_text(), dns.rdatatype.to_text(question.rdtype),
+                   dns.rdataclass.to_text(question.rdclass))
+            questions.append(key)
+            response = dns.message.make_response(query)
+            if key in ANSWERS:
+                response.answer.append(dns.rrset.from_text_list(
+                    question.name, 60, question.rdclass, question.rdtype, ANSWERS[key]
+                ))
+            sock.sendto(response.to_wire(), address)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield sock.getsockname()[1], questions
+    stopped.set()
+    thread.join()
+    sock.close()
+
+@pytest.fixture
+def dns_stub():
+    yield from start_dns_stub("127.0.0.1")
+
+@pytest.fixture
+def dns_stub_v6():
+    # Une source IPv6 joint son résolveur en IPv6
+    yield from start_dns_stub("::1")
+
+def test_a_record_for_ipv4(dns_stub):
+    port, questions = dns_stub
+    ips = asyncio.run(query_dns(f"dns://127.0.0.1:{port}/myip.test", "ipv4", 2))
+    assert ips == ["203.0.113.7"]
+    assert questions == [("myip.test.", "A", "IN")]
+
+def test_aaaa_record_for_ipv6(dns_stub_v6):
+    port, questions = dns_stub_v6
+    ips = asyncio.run(query_dns(f"dns://[::1]:{port}/myip.test", "ipv6", 2))
+    assert ips == ["2001:db8::7"]
+    assert questions == [("myip.test.", "AAAA", "IN")]
+
+def test_txt_record(dns_stub):
+    port, questions = dns_stub
+    ips = asyncio.run(query_dns(f"dns://127.0.0.1:{port}/o-o.myaddr.test?type=TXT", "ipv4", 2))
+    assert ips == ["198.51.100.7"]
+    assert questions == [("o-o.myaddr.test.", "TXT", "IN")]
+
+def test_chaos_class_txt_record(dns_stub):
+    port, questions = dns_stub
+    ips = asyncio.run(query_dns(f"dns://127.0.0.1:{port}/whoami.test?type=TXT&class=CH", "ipv4", 2))
+    assert ips == ["192.0.2.7"]
+    assert questions == [("whoami.test.", "TXT", "CH")]
+
+def test_no_answer_is_an_error(dns_stub):
+    port, _ = dns_stub
+    with pytest.raises(ValueError):
+        asyncio.run(query_dns(f"dns://127.0.0.1:{port}/unknown.test", "ipv4", 2))
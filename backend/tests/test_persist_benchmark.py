@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from app.core.database import async_engine
+from app.models import Domain, RecordType
+from app.services import route53
+from app.services.rate_limiter import RateLimiterRegistry
+from app.services.scheduler import PERSIST_CHUNK_SIZE, UpdateScheduler
+
+# Mesure de l'enregistrement groupé d'un cycle : python -m pytest -s tests/test_persist_benchmark.py
+DOMAINS = 2000
+ZONES = 20
+
+def test_cycle_persists_changed_records_in_bulk(monkeypatch, db, aws_account, user, fake_route53, public_ips):
+    db.add_all([
+        Domain(name=f"host{i}.example.com", zone_id=f"Z{i % ZONES}", record_type=RecordType.A, ttl=60,
+               aws_account_id=aws_account.id, user_id=user.id, is_active=True)
+        for i in range(DOMAINS)
+    ])
+    db.commit()
+    # Le limiteur Route53 n'entre pas dans la mesure
+    monkeypatch.setattr(route53, "route53_rate_limiter", RateLimiterRegistry(1e9, 10 ** 9))
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    scheduler = UpdateScheduler()
+
+    async def cycle():
+        scheduler.leader.heartbeat()
+        await scheduler._apply_interval_settings(await scheduler._get_interval_settings())
+        del statements[:]
+        started_at = time.monotonic()
+        results = await scheduler.update_all_domains()
+        return results, time.monotonic() - started_at
+
+    try:
+        results, elapsed = asyncio.run(cycle())
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    updates = sum(1 for statement in statements if statement.startswith("UPDATE domains"))
+    print(f"\n{DOMAINS} changed records in {ZONES} zones: {len(statements)} SQL statements "
+          f"({updates} UPDATE domains), {elapsed:.2f}s")
+    assert sum(results.values()) == DOMAINS
+    # Une requête UPDATE par lot de PERSIST_CHUNK_SIZE domaines, pas une par domaine
+    assert updates == -(-DOMAINS // PERSIST_CHUNK_SIZE)
+    # Lectures, un savepoint par lot et la libération des notifications
+    assert len(statements) <= 3 * updates + 5
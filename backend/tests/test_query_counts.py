@@ -0,0 +1,53 @@
+import asyncio
+
+from app.models import Domain, HostedZone, RecordType
+from app.services.scheduler import UpdateScheduler
+
+# Le nombre de requêtes SQL ne doit pas croître avec le nombre de lignes (pas de N+1)
+N = 5
+K = 4
+
+def add_rows(db, aws_account, user, start: int, count: int):
+    for i in range(start, start + count):
+        db.add(HostedZone(
+            aws_zone_id=f"Z{i}", name=f"zone{i}.example.com.", comment="",
+            is_private=False, record_count=1, aws_account_id=aws_account.id
+        ))
+        db.add(Domain(
+            name=f"host{i}.example.com", zone_id=f"Z{i % 3}", record_type=RecordType.A, ttl=60,
+            aws_account_id=aws_account.id, user_id=user.id, is_active=True
+        ))
+    db.commit()
+
+def test_hosted_zone_list_query_count_is_constant(client, db, aws_account, user):
+    counts = []
+    for start, count in [(0, N), (N, (K - 1) * N)]:
+        add_rows(db, aws_account, user, start, count)
+        response = client.get("/api/hosted-zones/")
+        assert response.status_code == 200
+        assert len(response.json()) == start + count
+        counts.append(int(response.headers["X-Query-Count"]))
+
+    assert counts[0] == counts[1]
+
+def test_update_cycle_query_count_is_constant(db, aws_account, user, fake_route53, public_ips):
+    scheduler = UpdateScheduler()
+
+    async def run_cycle():
+        scheduler.leader.heartbeat()
+        await scheduler._apply_interval_settings(await scheduler._get_interval_settings())
+        await scheduler.update_all_domains()
+        return scheduler.last_cycle
+
+    counts = []
+    for start, count, ip in [(0, N, "203.0.113.20"), (N, (K - 1) * N, "203.0.113.21")]:
+        add_rows(db, aws_account, user, start, count)
+        # Domaines insérés directement en base : l'index en mémoire doit être rechargé
+        scheduler.invalidate_domain_index()
+        public_ips["ipv4"] = ip
+        cycle = asyncio.run(run_cycle())
+        assert cycle["checked"] == start + count
+        assert cycle["updated"] == start + count
+        counts.append(cycle["queries"])
+
+    assert counts[0] == counts[1]
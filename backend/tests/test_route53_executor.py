@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import route53
+from app.services.route53 import Route53Service
+
+SLOW_CALL_SECONDS = 0.3
+TICK_SECONDS = 0.01
+
+class SlowRoute53Client:
+    def change_resource_record_sets(self, HostedZoneId, ChangeBatch):
+        # Appel boto3 bloquant, comme un Route53 lent
+        time.sleep(SLOW_CALL_SECONDS)
+        return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+
+async def max_ticker_lag(service: Route53Service, calls: int) -> float:
+    """Run slow Route53 calls next to a ticker and return the ticker's worst lag"""
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal lag
+        while not done.is_set():
+            started_at = time.monotonic()
+            await asyncio.sleep(TICK_SECONDS)
+            lag = max(lag, time.monotonic() - started_at - TICK_SECONDS)
+
+    async def publish():
+        await asyncio.gather(*(
+            service._run(service.client.change_resource_record_sets, HostedZoneId="Z1", ChangeBatch={"Changes": []})
+            for _ in range(calls)
+        ))
+        done.set()
+
+    await asyncio.gather(ticker(), publish())
+    return lag
+
+@pytest.fixture
+def slow_route53(monkeypatch):
+    client = SlowRoute53Client()
+    monkeypatch.setattr(route53.route53_clients, "get_client", lambda aws_account: client)
+    return client
+
+def test_threadpool_backend_keeps_event_loop_responsive(monkeypatch, aws_account, slow_route53):
+    monkeypatch.setattr(settings, "route53_backend", "threadpool")
+    service = Route53Service(aws_account)
+
+    lag = asyncio.run(max_ticker_lag(service, calls=3))
+
+    assert lag < SLOW_CALL_SECONDS / 3
+
+def test_inline_backend_blocks_event_loop(monkeypatch, aws_account, slow_route53):
+    # Témoin : le même appel exécuté sur la boucle retarde le ticker d'un appel entier
+    monkeypatch.setattr(settings, "route53_backend", "inline")
+    service = Route53Service(aws_account)
+
+    lag = asyncio.run(max_ticker_lag(service, calls=1))
+
+    assert lag >= SLOW_CALL_SECONDS * 0.9
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import Domain, RecordType
+from app.services.ip_detection import ip_service
+from app.services.scheduler import UpdateScheduler
+
+OLD_IP = "203.0.113.10"
+NEW_IP = "203.0.113.11"
+
+def add_domains(db, aws_account, user, count: int):
+    for i in range(count):
+        db.add(Domain(
+            name=f"host{i}.example.com", zone_id="Z1", record_type=RecordType.A, ttl=60,
+            aws_account_id=aws_account.id, user_id=user.id, is_active=True
+        ))
+    db.commit()
+
+def published_ips(db):
+    db.expire_all()
+    return {domain.current_ip for domain in db.scalars(select(Domain))}
+
+async def start(scheduler: UpdateScheduler):
+    scheduler.leader.heartbeat()
+    await scheduler._apply_interval_settings(await scheduler._get_interval_settings())
+
+def slow_probe_editing_a_domain(monkeypatch, scheduler: UpdateScheduler, domain_id: int):
+    """IP change seen by a slow probe while a domain is edited through the API"""
+    async def ipv4(*args, **kwargs):
+        scheduler.invalidate_domain_index(domain_id)
+        await asyncio.sleep(0.2)
+        return NEW_IP
+
+    monkeypatch.setattr(ip_service, "get_public_ipv4", ipv4)
+
+def test_tick_survives_index_invalidated_during_probe(monkeypatch, db, aws_account, user, fake_route53, public_ips):
+    add_domains(db, aws_account, user, 10)
+    scheduler = UpdateScheduler()
+
+    async def scenario():
+        await start(scheduler)
+        public_ips["ipv4"] = OLD_IP
+        assert len(await scheduler._tick()) == 10
+
+        slow_probe_editing_a_domain(monkeypatch, scheduler, domain_id=1)
+        # La période de détection est écoulée
+        scheduler._ips_detected_at = None
+        return await scheduler._tick()
+
+    results = asyncio.run(scenario())
+
+    # Tous les domaines deviennent dus avec la nouvelle IP, pas seulement celui modifié
+    assert len(results) == 10 and all(results.values())
+    assert published_ips(db) == {NEW_IP}
+
+def test_full_cycle_survives_index_invalidated_during_probe(monkeypatch, db, aws_account, user, fake_route53, public_ips):
+    add_domains(db, aws_account, user, 10)
+    scheduler = UpdateScheduler()
+
+    async def scenario():
+        await start(scheduler)
+        public_ips["ipv4"] = OLD_IP
+        await scheduler.update_all_domains()
+
+        slow_probe_editing_a_domain(monkeypatch, scheduler, domain_id=1)
+        return await scheduler.update_all_domains()
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 10 and all(results.values())
+    assert published_ips(db) == {NEW_IP}
+
+def test_reconciliation_lists_deferred_zones_first(monkeypatch, db, aws_account, user, fake_route53):
+    zones = [f"Z{i}" for i in range(6)]
+    for i, zone_id in enumerate(zones):
+        name = f"host{i}.example.com"
+        db.add(Domain(
+            name=name, zone_id=zone_id, record_type=RecordType.A, ttl=60, current_ip=OLD_IP,
+            aws_account_id=aws_account.id, user_id=user.id, is_active=True
+        ))
+        fake_route53.record_sets[zone_id] = [
+            {"Name": f"{name}.", "Type": "A", "TTL": 60, "ResourceRecords": [{"Value": OLD_IP}]}
+        ]
+    db.commit()
+    # Budget de deux listings environ par réconciliation, une zone à la fois
+    fake_route53.list_delay = 0.1
+    monkeypatch.setattr(settings, "reconcile_budget_seconds", 0.15)
+    monkeypatch.setattr(settings, "scheduler_max_concurrency_per_account", 1)
+    scheduler = UpdateScheduler()
+
+    async def scenario():
+        await start(scheduler)
+        # Au moins une zone listée par passe : chaque zone l'est avant six passes
+        for passes in range(1, len(zones) + 1):
+            await scheduler.reconcile_zones()
+            if set(fake_route53.listed) == set(zones):
+                return passes
+
+    passes = asyncio.run(scenario())
+
+    # Le budget propre à la réconciliation a bien interrompu la première passe
+    assert passes is not None and passes > 1
+
+@pytest.fixture
+def connections_during_publish(monkeypatch, fake_route53):
+    """Async engine connections held while each Route53 change batch is sent"""
+    held = {"now": 0}
+    seen = []
+
+    def checkout(*args):
+        held["now"] += 1
+
+    def checkin(*args):
+        held["now"] -= 1
+
+    event.listen(async_engine.sync_engine, "checkout", checkout)
+    event.listen(async_engine.sync_engine, "checkin", checkin)
+    change = fake_route53.change_resource_record_sets
+
+    def change_resource_record_sets(**kwargs):
+        seen.append(held["now"])
+        return change(**kwargs)
+
+    monkeypatch.setattr(fake_route53, "change_resource_record_sets", change_resource_record_sets)
+    yield seen
+    event.remove(async_engine.sync_engine, "checkout", checkout)
+    event.remove(async_engine.sync_engine, "checkin", checkin)
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_update_cycle_holds_no_connection_while_publishing(monkeypatch, db, aws_account, user, public_ips,
+                                                          connections_during_publish, sharded):
+    monkeypatch.setattr(settings, "scheduler_sharding_enabled", sharded)
+    add_domains(db, aws_account, user, 3)
+    scheduler = UpdateScheduler()
+
+    async def scenario():
+        await start(scheduler)
+        return await scheduler.update_all_domains()
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 3 and all(results.values())
+    assert connections_during_publish and set(connections_during_publish) == {0}
+
+def test_pushed_update_holds_no_connection_while_publishing(db, aws_account, user, connections_during_publish):
+    add_domains(db, aws_account, user, 3)
+    scheduler = UpdateScheduler()
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            domains = (await session.scalars(
+                select(Domain).options(selectinload(Domain.aws_account))
+            )).all()
+            return await scheduler.publish_updates([(domain, NEW_IP) for domain in domains], session)
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 3 and all(results.values())
+    assert set(connections_during_publish) == {0}
+    assert published_ips(db) == {NEW_IP}
@@ -6,7 +6,8 @@ import {
   GlobeAltIcon, 
   CheckCircleIcon, 
   CloudIcon, 
-  ComputerDesktopIcon 
+  ComputerDesktopIcon,
+  ClockIcon
 } from '@heroicons/react/24/outline';
 
 interface DashboardProps {
@@ -45,12 +46,18 @@ const Dashboard: React.FC<DashboardProps> = ({ onPageChange }) => {
       color: 'bg-blue-500',
       isIP: true,
     },
+    {
+      name: stats?.data.adaptive_polling ? t('dashboard.check_interval_adaptive') : t('dashboard.check_interval'),
+      value: `${stats?.data.effective_interval || 300} ${t('settings.seconds')}`,
+      icon: ClockIcon,
+      color: 'bg-purple-500',
+    },
   ];
 
   return (
     <div>
       {/* Stats */}
-      <div className="grid grid-cols-1 gap-5 sm:grid-cols-2 lg:grid-cols-4">
+      <div className="grid grid-cols-1 gap-5 sm:grid-cols-2 lg:grid-cols-5">
         {statsData.map((item, index) => (
           <div key={index} className="bg-white overflow-hidden shadow rounded-lg">
             <div className="p-5">
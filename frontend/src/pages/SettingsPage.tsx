@@ -232,7 +232,7 @@ const SettingsPage: React.FC = () => {
                   {t('settings.current_refresh_interval')}
                 </dt>
                 <dd className="text-sm text-gray-900 font-mono">
-                  {settings?.data['scheduler.refresh_interval']?.value || 300} {t('settings.seconds')}
+                  {stats?.data.effective_interval || settings?.data['scheduler.refresh_interval']?.value || 300} {t('settings.seconds')}
                 </dd>
               </div>
               <div className="text-center">
@@ -51,6 +51,7 @@ export interface Domain {
   aws_account_id: number;
   slack_account_id?: number;
   hosted_zone_id?: number;
+  check_interval?: number | null;
 }
 
 export interface SlackAccount {
@@ -85,6 +86,8 @@ export interface DashboardStats {
   total_aws_accounts: number;
   current_ipv4?: string;
   current_ipv6?: string;
+  effective_interval?: number;
+  adaptive_polling?: boolean;
 }
 
 export const authAPI = {